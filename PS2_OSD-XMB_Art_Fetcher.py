@@ -1,605 +1,675 @@
-import os
-import sys
-import requests
-import pycdlib
-import re
-import json
-import yaml
-import xml.etree.ElementTree as ET
-import warnings
-import zipfile
-from pathlib import Path
-from io import BytesIO
-from difflib import SequenceMatcher
-
-# Suppress the specific deprecation warning
-warnings.filterwarnings("ignore", category=DeprecationWarning, message="Testing an element's truth value")
-
-CACHE_FILE = "cache.json"
-LOG_FILE = "log.txt"
-CONFIG_FILE = "config.json"
-METADATA_URL = "https://gamesdb.launchbox-app.com/Metadata.zip"
-
-# Clear screen function
-def clear_screen():
-    os.system('cls' if os.name == 'nt' else 'clear')
-
-# Load config
-def load_config():
-    if os.path.exists(CONFIG_FILE):
-        try:
-            with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            return {}
-    return {}
-
-# Save config
-def save_config(config):
-    with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-        json.dump(config, f, ensure_ascii=False, indent=4)
-
-# Load cache with new structure
-def load_cache():
-    if os.path.exists(CACHE_FILE):
-        try:
-            with open(CACHE_FILE, "r", encoding="utf-8") as f:
-                cache_data = json.load(f)
-                # Ensure the cache has the proper structure
-                if "scanned_files" not in cache_data:
-                    cache_data["scanned_files"] = {}
-                if "excluded_files" not in cache_data:
-                    cache_data["excluded_files"] = []
-                return cache_data
-        except json.JSONDecodeError:
-            # Return empty cache structure if file is corrupted
-            return {"scanned_files": {}, "excluded_files": []}
-    return {"scanned_files": {}, "excluded_files": []}
-
-# Save cache
-def save_cache(cache):
-    with open(CACHE_FILE, "w", encoding="utf-8") as f:
-        json.dump(cache, f, ensure_ascii=False, indent=4)
-
-# Function to download and extract Metadata.xml
-def download_metadata():
-    if os.path.exists("Metadata.xml"):
-        log("Metadata.xml already exists, skipping download.")
-        return True
-    
-    log("Downloading Metadata.zip...")
-    try:
-        response = requests.get(METADATA_URL)
-        if response.status_code != 200:
-            log(f"[ERROR] Failed to download Metadata.zip (status {response.status_code})")
-            return False
-        
-        # Save the zip file
-        with open("Metadata.zip", "wb") as f:
-            f.write(response.content)
-        
-        # Extract only Metadata.xml from the zip
-        with zipfile.ZipFile("Metadata.zip", 'r') as zip_ref:
-            # Look for Metadata.xml in the zip file
-            for file_info in zip_ref.infolist():
-                if file_info.filename.endswith('Metadata.xml'):
-                    # Extract the file
-                    zip_ref.extract(file_info)
-                    log("Extracted Metadata.xml from zip.")
-                    break
-            else:
-                log("[ERROR] Metadata.xml not found in the downloaded zip file.")
-                return False
-        
-        # Clean up: delete the zip file
-        os.remove("Metadata.zip")
-        log("Deleted Metadata.zip after extraction.")
-        return True
-        
-    except Exception as e:
-        log(f"[ERROR] Failed to download or extract Metadata.zip: {e}")
-        # Clean up if possible
-        if os.path.exists("Metadata.zip"):
-            try:
-                os.remove("Metadata.zip")
-            except:
-                pass
-        return False
-
-cache = load_cache()
-config = load_config()
-
-# Language setup
-LANGUAGES = {
-    "pt": {
-        "choose_lang": "Selecione o idioma / Select language:\n1 - Português\n2 - English\nEscolha: ",
-        "invalid_lang": "Opção inválida, padrão Português selecionado.",
-        "ask_root": "Digite o diretório raiz que contém as pastas 'OSDXMB' e 'DVD': ",
-        "missing_folders": "Erro: As pastas 'OSDXMB' y 'DVD' devem existir dentro do diretório fornecido.",
-        "ask_api_key": ("Digite sua SteamGridDB API Key: ",
-                         "Este aplicativo utiliza a API do SteamGridDB para obter as artes caso não consiga obter de outras formas. Você pode obter sua API Key gratuitamente em https://www.steamgriddb.com/profile/preferences na seção 'API Key'."),
-        "api_key_optional": "A API Key é OPCIONAL. Pressione Enter para pular ou digite sua API e pressione Enter: ",
-        "process_start": "Iniciando escaneamento...",
-        "process_end": "Processo concluído. Verifique o arquivo log.txt para detalhes.",
-        "use_saved_config": "Deseja usar o diretório e API KEY salvos?\nDiretório salvo: {saved_root}\nAPI Key salva: {saved_api_key}\n1 - Sim\n2 - Não, usar novos\nEscolha: ",
-        "no_saved_config": "Nenhuma configuração salva encontrada.",
-        "config_saved": "Configuração salva para próxima execução.",
-        "summary_title": "=== RESUMO DO PROCESSAMENTO ===",
-        "successful_games": "Jogos com arte baixada com sucesso:",
-        "failed_games": "Jogos sem arte disponível:",
-        "press_any_key": "Pressione qualquer tecla para sair...",
-        "total_processed": "Total de ISOs processados: {}",
-        "success_count": "Artes baixadas com sucesso: {}",
-        "failed_count": "Artes não encontradas: {}",
-        "exclude_prompt": "\nDeseja adicionar os jogos sem arte à lista de exclusão?\n1 - Sim\n2 - Não\nEscolha: ",
-        "excluded_added": "Jogos adicionados à lista de exclusão.",
-        "downloading_metadata": "Baixando Metadata.xml...",
-        "metadata_download_failed": "Falha ao baixar Metadata.xml. O aplicativo continuará sem ele."
-    },
-    "en": {
-        "choose_lang": "Select language:\n1 - Portuguese\n2 - English\nChoice: ",
-        "invalid_lang": "Invalid option, defaulting to English.",
-        "ask_root": "Enter the root directory containing 'OSDXMB' and 'DVD' folders: ",
-        "missing_folders": "Error: The 'OSDXMB' and 'DVD' folders must exist inside the provided directory.",
-        "ask_api_key": ("Enter your SteamGridDB API Key: ",
-                         "This app uses the SteamGridDB API to fetch artwork if it cannot be obtained through other means. You can get your API Key for free at https://www.steamgriddb.com/profile/preferences under the 'API Key' section."),
-        "api_key_optional": "API Key is OPTIONAL. Press Enter to skip or type your API key and press Enter: ",
-        "process_start": "Starting scan...",
-        "process_end": "Process finished. Check log.txt for details.",
-        "use_saved_config": "Use saved directory and API KEY?\nSaved directory: {saved_root}\nSaved API Key: {saved_api_key}\n1 - Yes\n2 - No, use new ones\nChoice: ",
-        "no_saved_config": "No saved configuration found.",
-        "config_saved": "Configuration saved for next execution.",
-        "summary_title": "=== PROCESSING SUMMARY ===",
-        "successful_games": "Games with art successfully downloaded:",
-        "failed_games": "Games without available art:",
-        "press_any_key": "Press any key to exit...",
-        "total_processed": "Total ISOs processed: {}",
-        "success_count": "Art successfully downloaded: {}",
-        "failed_count": "Art not found: {}",
-        "exclude_prompt": "\nDo you want to add games without art to the exclusion list?\n1 - Yes\n2 - No\nChoice: ",
-        "excluded_added": "Games added to exclusion list.",
-        "downloading_metadata": "Downloading Metadata.xml...",
-        "metadata_download_failed": "Failed to download Metadata.xml. The app will continue without it."
-    }
-}
-
-# Clear screen at start
-clear_screen()
-
-# Choose language
-choice = input(LANGUAGES["pt"]["choose_lang"])
-clear_screen()
-
-if choice.strip() == "2":
-    lang = "en"
-elif choice.strip() == "1":
-    lang = "pt"
-else:
-    print(LANGUAGES["en"]["invalid_lang"])
-    lang = "en"
-
-L = LANGUAGES[lang]
-
-# Logger (always English)
-def log(message):
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(message + "\n")
-    print(message)
-
-# Function to calculate string similarity
-def string_similarity(a, b):
-    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
-
-# Function to parse Metadata.xml and find matching game
-def find_game_in_metadata(game_name):
-    if not os.path.exists("Metadata.xml"):
-        log(f"[INFO] Metadata.xml not found, skipping local lookup for {game_name}")
-        return None
-    
-    try:
-        tree = ET.parse("Metadata.xml")
-        root = tree.getroot()
-        
-        best_match = None
-        highest_similarity = 0
-        
-        for game in root.findall(".//Game"):
-            name_elem = game.find("Name")
-            if name_elem is not None and name_elem.text is not None:
-                similarity = string_similarity(game_name, name_elem.text)
-                if similarity > highest_similarity and similarity > 0.7:  # 70% similarity threshold
-                    highest_similarity = similarity
-                    best_match = game
-        
-        if best_match:
-            database_id_elem = best_match.find("DatabaseID")
-            if database_id_elem is not None and database_id_elem.text is not None:
-                matched_name = best_match.find("Name")
-                matched_name_text = matched_name.text if matched_name is not None and matched_name.text is not None else "Unknown"
-                log(f"Found match in Metadata.xml: {game_name} -> {matched_name_text} (similarity: {highest_similarity:.2f})")
-                return database_id_elem.text
-        
-        log(f"[INFO] No match found in Metadata.xml for {game_name}")
-        return None
-    except Exception as e:
-        log(f"[ERROR] Failed to parse Metadata.xml: {e}")
-        return None
-
-# Function to find images in Metadata.xml by database ID
-def find_images_in_metadata(database_id):
-    if not os.path.exists("Metadata.xml"):
-        return None, None
-    
-    try:
-        tree = ET.parse("Metadata.xml")
-        root = tree.getroot()
-        
-        logo_url = None
-        hero_url = None
-        
-        # Find logo (Clear Logo)
-        for game_image in root.findall(".//GameImage"):
-            db_id_elem = game_image.find("DatabaseID")
-            type_elem = game_image.find("Type")
-            file_elem = game_image.find("FileName")
-            
-            if (db_id_elem is not None and db_id_elem.text is not None and db_id_elem.text == database_id and
-                type_elem is not None and type_elem.text is not None and type_elem.text == "Clear Logo" and
-                file_elem is not None and file_elem.text is not None and not logo_url):
-                logo_url = f"https://images.launchbox-app.com//{file_elem.text}"
-        
-        # Find hero (Fanart - Background)
-        for game_image in root.findall(".//GameImage"):
-            db_id_elem = game_image.find("DatabaseID")
-            type_elem = game_image.find("Type")
-            file_elem = game_image.find("FileName")
-            
-            if (db_id_elem is not None and db_id_elem.text is not None and db_id_elem.text == database_id and
-                type_elem is not None and type_elem.text is not None and type_elem.text == "Fanart - Background" and
-                file_elem is not None and file_elem.text is not None and not hero_url):
-                hero_url = f"https://images.launchbox-app.com//{file_elem.text}"
-        
-        # If no hero found, look for any screenshot
-        if not hero_url:
-            for game_image in root.findall(".//GameImage"):
-                db_id_elem = game_image.find("DatabaseID")
-                type_elem = game_image.find("Type")
-                file_elem = game_image.find("FileName")
-                
-                if (db_id_elem is not None and db_id_elem.text is not None and db_id_elem.text == database_id and
-                    type_elem is not None and type_elem.text is not None and "Screenshot" in type_elem.text and
-                    file_elem is not None and file_elem.text is not None and not hero_url):
-                    hero_url = f"https://images.launchbox-app.com//{file_elem.text}"
-        
-        return logo_url, hero_url
-    except Exception as e:
-        log(f"[ERROR] Failed to search for images in Metadata.xml: {e}")
-        return None, None
-
-# New implementation of fetch_sgdb_image with fallback
-def fetch_sgdb_images(game_name, api_key):
-    # Try to find the game in Metadata.xml first
-    database_id = find_game_in_metadata(game_name)
-    logo_url, hero_url = None, None
-    
-    if database_id:
-        # Try to find both images in Metadata.xml
-        logo_url, hero_url = find_images_in_metadata(database_id)
-        
-        if logo_url:
-            log(f"Found logo for {game_name} in Metadata.xml: {logo_url}")
-        if hero_url:
-            log(f"Found hero for {game_name} in Metadata.xml: {hero_url}")
-    
-    # Fallback to SteamGridDB API if available and needed
-    if api_key and (not logo_url or not hero_url):
-        log(f"Falling back to SteamGridDB API for {game_name}")
-        if not logo_url:
-            logo_url = fetch_sgdb_image_api(game_name, "logos", api_key)
-        if not hero_url:
-            hero_url = fetch_sgdb_image_api(game_name, "heroes", api_key)
-    
-    if not logo_url:
-        log(f"[WARN] No logo found for {game_name}")
-    if not hero_url:
-        log(f"[WARN] No hero found for {game_name}")
-    
-    return logo_url, hero_url
-
-# Original implementation as fallback
-def fetch_sgdb_image_api(game_name, category, api_key):
-    url = f"https://www.steamgriddb.com/api/v2/search/autocomplete/{game_name}"
-    headers = {"Authorization": f"Bearer {api_key}"}
-    r = requests.get(url, headers=headers)
-    if r.status_code != 200:
-        log(f"[ERROR] SteamGridDB search failed for {game_name} (status {r.status_code})")
-        return None
-
-    data = r.json()
-    if not data.get("data"):
-        log(f"[WARN] No SteamGridDB results found for {game_name}")
-        return None
-
-    game_id = data["data"][0]["id"]
-    url = f"https://www.steamgriddb.com/api/v2/{category}/game/{game_id}"
-    r = requests.get(url, headers=headers)
-    if r.status_code != 200:
-        log(f"[ERROR] Failed to fetch {category} for {game_name} (status {r.status_code})")
-        return None
-
-    images = r.json().get("data")
-    if not images:
-        log(f"[WARN] No {category} images found for {game_name}")
-        return None
-
-    log(f"Fetched {category} for {game_name} from SteamGridDB: {images[0]['url']}")
-    return images[0]["url"]
-
-# Extract GameID from ISO
-def extract_gameid_from_iso(iso_path):
-    iso = pycdlib.PyCdlib()
-    try:
-        iso.open(str(iso_path))
-        buf = BytesIO()
-        iso.get_file_from_iso_fp(buf, iso_path="/SYSTEM.CNF;1")
-        buf.seek(0)
-        text = buf.read().decode("utf-8", errors="ignore")
-        for line in text.splitlines():
-            if "BOOT2 = cdrom0:" in line:
-                # Extract the original GameID with dots and underscores
-                original_gameid = line.strip().split("cdrom0:\\")[-1].replace(";1", "")
-                log(f"Extracted GameID {original_gameid} from {iso_path.name}")
-                return original_gameid
-    except Exception as e:
-        log(f"[ERROR] Could not extract GameID from {iso_path.name}: {e}")
-    finally:
-        try:
-            iso.close()
-        except:
-            pass
-    return None
-
-# Create a clean GameID for GameIndex.yaml lookup
-def clean_gameid_for_lookup(gameid):
-    # Remove dots and replace underscores with hyphens for GameIndex.yaml lookup
-    return gameid.replace('.', '').replace('_', '-')
-
-# Lookup game name from GameIndex.yaml
-def lookup_game_name(gameid):
-    # Clean the GameID for lookup in GameIndex.yaml
-    clean_gameid = clean_gameid_for_lookup(gameid)
-    
-    url = "https://raw.githubusercontent.com/PCSX2/pcsx2/refs/heads/master/bin/resources/GameIndex.yaml"
-    try:
-        r = requests.get(url)
-        if r.status_code != 200:
-            log(f"[ERROR] Failed to fetch GameIndex.yaml (status {r.status_code})")
-            return None
-
-        # Load the YAML content
-        data = yaml.safe_load(r.text)
-        
-        # The YAML structure is a dictionary where keys are GameIDs
-        # and values contain game information including the name
-        if clean_gameid in data:
-            name = data[clean_gameid].get('name')
-            if name:
-                log(f"Found game name for {clean_gameid}: {name}")
-                return name
-        
-        log(f"[WARN] GameID {clean_gameid} not found in GameIndex.yaml")
-        return None
-
-    except Exception as e:
-        log(f"[ERROR] Exception while looking up game name for {clean_gameid}: {e}")
-        return None
-
-# Main flow
-if __name__ == "__main__":
-    if os.path.exists(LOG_FILE):
-        os.remove(LOG_FILE)
-
-    # Download Metadata.xml if it doesn't exist
-    print(L["downloading_metadata"])
-    if not download_metadata():
-        print(L["metadata_download_failed"])
-    clear_screen()  # Clear screen after metadata download
-
-    # Lists to track successful and failed games
-    successful_games = []
-    failed_games = []
-
-    # Check if we have saved config and ask user if they want to use it
-    saved_root = config.get('root_directory')
-    saved_api_key = config.get('api_key')
-    
-    use_saved = False
-    
-    # Modified condition to only require root directory (API key is optional)
-    if saved_root and os.path.exists(saved_root):
-        try:
-            # Show masked API key for privacy
-            masked_api_key = saved_api_key if saved_api_key and len(saved_api_key) <= 5 else (saved_api_key[:5] + '...' if saved_api_key else 'None')
-            choice = input(L["use_saved_config"].format(saved_root=saved_root, saved_api_key=masked_api_key))
-            clear_screen()
-            if choice == "1":
-                use_saved = True
-                root = saved_root
-                api_key = saved_api_key
-        except:
-            use_saved = False
-    
-    if not use_saved:
-        if not saved_root:
-            print(L["no_saved_config"])
-        
-        root = input(L["ask_root"])
-        clear_screen()
-        
-        # API key is now optional
-        api_key = os.getenv("STEAMGRIDDB_API_KEY")
-        if not api_key:
-            print(L["ask_api_key"][1])
-            api_key_input = input(L["api_key_optional"])
-            api_key = api_key_input if api_key_input.strip() else None
-            clear_screen()
-        
-        # Save the new configuration
-        config['root_directory'] = root
-        config['api_key'] = api_key
-        save_config(config)
-        print(L["config_saved"])
-
-    root_path = Path(root)
-
-    if not (root_path / "OSDXMB").exists() or not (root_path / "DVD").exists():
-        print(L["missing_folders"])
-        sys.exit(1)
-
-    print(L["process_start"])
-    log("=== PS2 ISO Scan Started ===")
-
-    dvd_path = root_path / "DVD"
-    
-    # Get all ISO files and filter out excluded ones
-    iso_files = [iso_file for iso_file in dvd_path.glob("*.iso") 
-                if iso_file.name not in cache["excluded_files"]]
-    
-    total_isos = len(iso_files)
-    
-    for iso_file in iso_files:
-        filename = iso_file.name
-        
-        # Check if file is already in cache
-        if filename in cache["scanned_files"]:
-            cache_entry = cache["scanned_files"][filename]
-            
-            if cache_entry["status"] == "OK":
-                log(f"Skipping {filename} - already processed successfully")
-                successful_games.append(f"{cache_entry.get('game_name', 'Unknown')} (GameID: {cache_entry['gameid']})")
-                continue
-            elif cache_entry["status"] == "BAD":
-                log(f"Retrying {filename} - previous attempt failed")
-                # Continue with processing
-            else:
-                log(f"Unknown status for {filename} in cache, reprocessing")
-        
-        log(f"Processing ISO: {filename}")
-        original_gameid = extract_gameid_from_iso(iso_file)
-        if not original_gameid:
-            log(f"Failed to extract GameID from {filename}")
-            # Update cache with BAD status
-            cache["scanned_files"][filename] = {
-                "status": "BAD",
-                "gameid": "UNKNOWN",
-                "reason": "Failed to extract GameID"
-            }
-            save_cache(cache)
-            failed_games.append(f"{filename} (Failed to extract GameID)")
-            continue
-        
-        name = lookup_game_name(original_gameid)
-        if not name:
-            log(f"GameID {original_gameid} not found in GameIndex for {filename}")
-            # Update cache with BAD status
-            cache["scanned_files"][filename] = {
-                "status": "BAD",
-                "gameid": original_gameid,
-                "reason": "GameID not found in GameIndex"
-            }
-            save_cache(cache)
-            failed_games.append(f"{filename} (GameID: {original_gameid} - Not found in GameIndex)")
-            continue
-
-        # Use the original GameID (with dots and underscores) for the folder name
-        art_path = root_path / "OSDXMB" / "ART" / original_gameid
-        art_path.mkdir(parents=True, exist_ok=True)
-
-        # Get both logo and hero URLs at once
-        logo_url, hero_url = fetch_sgdb_images(name, api_key)
-
-        logo_success = False
-        hero_success = False
-
-        if logo_url:
-            try:
-                r = requests.get(logo_url)
-                with open(art_path / "ICON0.png", "wb") as f:
-                    f.write(r.content)
-                log(f"Saved ICON0.png for {name} [{original_gameid}]")
-                logo_success = True
-            except Exception as e:
-                log(f"[ERROR] Failed to save ICON0.png for {name}: {e}")
-
-        if hero_url:
-            try:
-                r = requests.get(hero_url)
-                with open(art_path / "PIC1.png", "wb") as f:
-                    f.write(r.content)
-                log(f"Saved PIC1.png for {name} [{original_gameid}]")
-                hero_success = True
-            except Exception as e:
-                log(f"[ERROR] Failed to save PIC1.png for {name}: {e}")
-
-        if logo_success or hero_success:
-            # Update cache with OK status
-            cache["scanned_files"][filename] = {
-                "status": "OK",
-                "gameid": original_gameid,
-                "game_name": name
-            }
-            save_cache(cache)
-            successful_games.append(f"{name} (GameID: {original_gameid})")
-        else:
-            # Update cache with BAD status
-            cache["scanned_files"][filename] = {
-                "status": "BAD",
-                "gameid": original_gameid,
-                "game_name": name,
-                "reason": "No art found"
-            }
-            save_cache(cache)
-            failed_games.append(f"{name} (GameID: {original_gameid} - No art found)")
-
-    log("=== PS2 ISO Scan Finished ===")
-    print(L["process_end"])
-    
-    # Ask user if they want to add failed games to exclusion list
-    if failed_games:
-        choice = input(L["exclude_prompt"])
-        if choice.strip() == "1":
-            for game_info in failed_games:
-                # Extract filename from the game info string
-                filename_match = re.search(r'^(.*?)\s*\(', game_info)
-                if filename_match:
-                    filename = filename_match.group(1).strip()
-                    if filename not in cache["excluded_files"]:
-                        cache["excluded_files"].append(filename)
-            
-            save_cache(cache)
-            print(L["excluded_added"])
-    
-    # Display summary
-    clear_screen()
-    print(L["summary_title"])
-    print()
-    print(L["total_processed"].format(total_isos))
-    print(L["success_count"].format(len(successful_games)))
-    print(L["failed_count"].format(len(failed_games)))
-    print()
-    
-    if successful_games:
-        print(L["successful_games"])
-        for game in successful_games:
-            print(f"  ✓ {game}")
-        print()
-    
-    if failed_games:
-        print(L["failed_games"])
-        for game in failed_games:
-            print(f"  ✗ {game}")
-        print()
-    
-    # Wait for user input before closing
-    input(L["press_any_key"])
-    clear_screen()
+import os
+import sys
+import json
+import warnings
+import signal
+import argparse
+import threading
+import multiprocessing
+from pathlib import Path
+from io import BytesIO
+from art_fetcher import http_client
+from art_fetcher.blob_store import BlobStore
+from art_fetcher.gameindex import GameIndex, clean_gameid_for_lookup
+from art_fetcher.images import (DEFAULT_ART_SIZES, IMAGE_CONTENT_TYPES, MAX_IMAGE_BYTES, ImageProcessor,
+                                 looks_like_image, parse_size)
+from art_fetcher.iso_reader import read_gameid
+from art_fetcher.library import Library
+from art_fetcher.lan_cache import DEFAULT_PORT as LAN_CACHE_PORT, LAN_CACHE_DIR, ArtCacheServer, parse_address
+from art_fetcher.logger import setup_logging, write_log
+from art_fetcher.metadata_index import DEFAULT_MAX_AGE_HOURS, METADATA_URL, MetadataIndex
+from art_fetcher.pipeline import DEFAULT_JOBS
+from art_fetcher.scan import ScanSummary, Scanner, plan_jobs, process_jobs
+from art_fetcher.scan_cache import ScanCache
+from art_fetcher.sgdb import SgdbCache, SgdbClient, SgdbThrottled
+from art_fetcher.tracing import REPORT_FILE, Profiler, traced, tracer
+from art_fetcher.watcher import DEFAULT_POLL_SECONDS, DEFAULT_SETTLE_SECONDS, LibraryWatcher
+
+# Suppress the specific deprecation warning
+warnings.filterwarnings("ignore", category=DeprecationWarning, message="Testing an element's truth value")
+
+CACHE_FILE = "cache.db"
+LOG_FILE = "log.txt"
+CONFIG_FILE = "config.json"
+
+# Exit codes, so scheduled (--headless) runs can tell a setup problem from games without art
+EXIT_OK = 0
+EXIT_SETUP_FAILED = 1
+EXIT_GAMES_FAILED = 3
+
+# Set by --headless: no prompts and no screen clearing (cron, systemd timers)
+headless = False
+
+# Clear screen function
+def clear_screen():
+    if headless:
+        return
+    os.system('cls' if os.name == 'nt' else 'clear')
+
+# Load config
+def load_config():
+    if os.path.exists(CONFIG_FILE):
+        try:
+            with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            return {}
+    return {}
+
+# Save config
+def save_config(config):
+    with open(CONFIG_FILE, "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False, indent=4)
+
+# Refresh Metadata.zip (the index reads Metadata.xml straight from it)
+def download_metadata(max_age_hours=DEFAULT_MAX_AGE_HOURS):
+    return MetadataIndex(log=log).refresh(METADATA_URL, max_age_hours)
+
+# Language setup
+LANGUAGES = {
+    "pt": {
+        "choose_lang": "Selecione o idioma / Select language:\n1 - Português\n2 - English\nEscolha: ",
+        "invalid_lang": "Opção inválida, padrão Português selecionado.",
+        "ask_root": "Digite o diretório raiz que contém as pastas 'OSDXMB' e 'DVD': ",
+        "missing_folders": "Erro: As pastas 'OSDXMB' y 'DVD' devem existir dentro do diretório fornecido.",
+        "missing_root": "Erro: Nenhum diretório raiz informado. Use --root ou salve um no config.json.",
+        "ask_api_key": ("Digite sua SteamGridDB API Key: ",
+                         "Este aplicativo utiliza a API do SteamGridDB para obter as artes caso não consiga obter de outras formas. Você pode obter sua API Key gratuitamente em https://www.steamgriddb.com/profile/preferences na seção 'API Key'."),
+        "api_key_optional": "A API Key é OPCIONAL. Pressione Enter para pular ou digite sua API e pressione Enter: ",
+        "process_start": "Iniciando escaneamento...",
+        "process_end": "Processo concluído. Verifique o arquivo log.txt para detalhes.",
+        "use_saved_config": "Deseja usar o diretório e API KEY salvos?\nDiretório salvo: {saved_root}\nAPI Key salva: {saved_api_key}\n1 - Sim\n2 - Não, usar novos\nEscolha: ",
+        "no_saved_config": "Nenhuma configuração salva encontrada.",
+        "config_saved": "Configuração salva para próxima execução.",
+        "summary_title": "=== RESUMO DO PROCESSAMENTO ===",
+        "successful_games": "Jogos com arte baixada com sucesso:",
+        "failed_games": "Jogos sem arte disponível:",
+        "press_any_key": "Pressione qualquer tecla para sair...",
+        "total_processed": "Total de ISOs processados: {}",
+        "success_count": "Artes baixadas com sucesso: {}",
+        "failed_count": "Artes não encontradas: {}",
+        "exclude_prompt": "\nDeseja adicionar os jogos sem arte à lista de exclusão?\n1 - Sim\n2 - Não\nEscolha: ",
+        "excluded_added": "Jogos adicionados à lista de exclusão.",
+        "downloading_metadata": "Baixando Metadata.xml...",
+        "metadata_download_failed": "Falha ao baixar Metadata.xml. O aplicativo continuará sem ele."
+    },
+    "en": {
+        "choose_lang": "Select language:\n1 - Portuguese\n2 - English\nChoice: ",
+        "invalid_lang": "Invalid option, defaulting to English.",
+        "ask_root": "Enter the root directory containing 'OSDXMB' and 'DVD' folders: ",
+        "missing_folders": "Error: The 'OSDXMB' and 'DVD' folders must exist inside the provided directory.",
+        "missing_root": "Error: No root directory given. Pass --root or save one in config.json.",
+        "ask_api_key": ("Enter your SteamGridDB API Key: ",
+                         "This app uses the SteamGridDB API to fetch artwork if it cannot be obtained through other means. You can get your API Key for free at https://www.steamgriddb.com/profile/preferences under the 'API Key' section."),
+        "api_key_optional": "API Key is OPTIONAL. Press Enter to skip or type your API key and press Enter: ",
+        "process_start": "Starting scan...",
+        "process_end": "Process finished. Check log.txt for details.",
+        "use_saved_config": "Use saved directory and API KEY?\nSaved directory: {saved_root}\nSaved API Key: {saved_api_key}\n1 - Yes\n2 - No, use new ones\nChoice: ",
+        "no_saved_config": "No saved configuration found.",
+        "config_saved": "Configuration saved for next execution.",
+        "summary_title": "=== PROCESSING SUMMARY ===",
+        "successful_games": "Games with art successfully downloaded:",
+        "failed_games": "Games without available art:",
+        "press_any_key": "Press any key to exit...",
+        "total_processed": "Total ISOs processed: {}",
+        "success_count": "Art successfully downloaded: {}",
+        "failed_count": "Art not found: {}",
+        "exclude_prompt": "\nDo you want to add games without art to the exclusion list?\n1 - Yes\n2 - No\nChoice: ",
+        "excluded_added": "Games added to exclusion list.",
+        "downloading_metadata": "Downloading Metadata.xml...",
+        "metadata_download_failed": "Failed to download Metadata.xml. The app will continue without it."
+    }
+}
+
+# Logger (always English), shared by the pipeline worker threads.
+# The log file is written by a background thread; only the console print is synchronous
+print_lock = threading.Lock()
+
+def log(message):
+    if write_log(message):
+        with print_lock:
+            print(message)
+
+# Indexed view of Metadata.xml, opened by the first pipeline stage that needs it
+metadata_index = None
+metadata_lock = threading.Lock()
+
+def get_metadata_index():
+    global metadata_index
+    with metadata_lock:
+        if metadata_index is None:
+            metadata_index = MetadataIndex(log=log)
+            try:
+                if not metadata_index.ensure_built():
+                    log("[INFO] Metadata.zip not found, local lookup disabled")
+            except Exception as e:
+                log(f"[ERROR] Failed to build Metadata index: {e}")
+        return metadata_index
+
+# Function to find the matching game in the Metadata index
+@traced("find_game_in_metadata")
+def find_game_in_metadata(game_name):
+    index = get_metadata_index()
+    if index.conn is None:
+        log(f"[INFO] Metadata.xml not found, skipping local lookup for {game_name}")
+        return None
+
+    try:
+        match = index.find_game(game_name)
+        if match:
+            database_id, matched_name, similarity = match
+            log(f"Found match in Metadata.xml: {game_name} -> {matched_name} (similarity: {similarity:.2f})")
+            return database_id
+
+        log(f"[INFO] No match found in Metadata.xml for {game_name}")
+        return None
+    except Exception as e:
+        log(f"[ERROR] Failed to query Metadata index: {e}")
+        return None
+
+# Function to find images in the Metadata index by database ID
+@traced("find_images_in_metadata")
+def find_images_in_metadata(database_id):
+    index = get_metadata_index()
+    if index.conn is None:
+        return None, None
+
+    try:
+        return index.find_images(database_id)
+    except Exception as e:
+        log(f"[ERROR] Failed to search for images in Metadata.xml: {e}")
+        return None, None
+
+# SteamGridDB client with its persistent response cache, opened once per run
+sgdb_client = None
+sgdb_lock = threading.Lock()
+
+def get_sgdb_client(api_key):
+    global sgdb_client
+    with sgdb_lock:
+        if sgdb_client is None:
+            sgdb_client = SgdbClient(api_key, SgdbCache(), log=log)
+        return sgdb_client
+
+# New implementation of fetch_sgdb_image with fallback; also reports whether SteamGridDB was rate limiting
+def fetch_sgdb_images(game_name, api_key, database_id):
+    # database_id is the Metadata.xml match for game_name, or None
+    logo_url, hero_url = None, None
+    
+    if database_id:
+        # Try to find both images in Metadata.xml
+        logo_url, hero_url = find_images_in_metadata(database_id)
+        
+        if logo_url:
+            log(f"Found logo for {game_name} in Metadata.xml: {logo_url}")
+        if hero_url:
+            log(f"Found hero for {game_name} in Metadata.xml: {hero_url}")
+    
+    # Fallback to SteamGridDB API if available and needed (one search, then only the missing categories)
+    throttled = False
+    if api_key and (not logo_url or not hero_url):
+        log(f"Falling back to SteamGridDB API for {game_name}")
+        categories = [category for category, url in (("logos", logo_url), ("heroes", hero_url)) if not url]
+        try:
+            found = get_sgdb_client(api_key).fetch(game_name, categories)
+        except SgdbThrottled as e:
+            log(f"[WARN] {e}, {game_name} will be retried on the next run")
+            found, throttled = e.urls, True
+        logo_url = logo_url or found.get("logos")
+        hero_url = hero_url or found.get("heroes")
+    
+    if not logo_url:
+        log(f"[WARN] No logo found for {game_name}")
+    if not hero_url:
+        log(f"[WARN] No hero found for {game_name}")
+    
+    return logo_url, hero_url, throttled
+
+# Extract GameID from ISO
+@traced("extract_gameid")
+def extract_gameid_from_iso(iso_path):
+    # Fast path: read SYSTEM.CNF straight from the ISO9660 root directory
+    try:
+        original_gameid = read_gameid(iso_path)
+        log(f"Extracted GameID {original_gameid} from {iso_path.name}")
+        return original_gameid
+    except Exception as e:
+        if iso_path.suffix.lower() != ".iso":
+            # pycdlib can't open compressed images, so there is nothing to fall back to
+            log(f"[ERROR] Could not extract GameID from {iso_path.name}: {e}")
+            return None
+        log(f"[INFO] Fast GameID read failed for {iso_path.name} ({e}), falling back to pycdlib")
+
+    # pycdlib is only needed for this rare fallback, so it isn't imported at startup
+    import pycdlib
+    iso = pycdlib.PyCdlib()
+    try:
+        iso.open(str(iso_path))
+        buf = BytesIO()
+        iso.get_file_from_iso_fp(buf, iso_path="/SYSTEM.CNF;1")
+        buf.seek(0)
+        text = buf.read().decode("utf-8", errors="ignore")
+        for line in text.splitlines():
+            if "BOOT2 = cdrom0:" in line:
+                # Extract the original GameID with dots and underscores
+                original_gameid = line.strip().split("cdrom0:\\")[-1].replace(";1", "")
+                log(f"Extracted GameID {original_gameid} from {iso_path.name}")
+                return original_gameid
+    except Exception as e:
+        log(f"[ERROR] Could not extract GameID from {iso_path.name}: {e}")
+    finally:
+        try:
+            iso.close()
+        except:
+            pass
+    return None
+
+# Serial -> name index, loaded by the first lookup of the run
+game_index = None
+game_index_lock = threading.Lock()
+
+def get_game_index():
+    global game_index
+    with game_index_lock:
+        if game_index is None:
+            game_index = GameIndex(log=log)
+            game_index.load()
+        return game_index
+
+# Lookup game name from the local GameIndex index
+@traced("lookup_game_name")
+def lookup_game_name(gameid):
+    # Clean the GameID for lookup in GameIndex.yaml
+    clean_gameid = clean_gameid_for_lookup(gameid)
+
+    name = get_game_index().lookup(gameid)
+    if name:
+        log(f"Found game name for {clean_gameid}: {name}")
+        return name
+
+    log(f"[WARN] GameID {clean_gameid} not found in GameIndex.yaml")
+    return None
+
+# Converts downloaded art to real, resized PNGs on a process pool
+image_processor = None
+blob_store = None
+
+# Fetch one image through the art store (downloaded and converted once per URL) and link it into place
+@traced("download_art")
+def download_art(url, art_path, kind):
+    def produce(staging_path):
+        tmp_path = http_client.download_to_temp(url, blob_store.directory, max_bytes=MAX_IMAGE_BYTES,
+                                                content_types=IMAGE_CONTENT_TYPES, check_header=looks_like_image)
+        image_processor.save(tmp_path, staging_path, kind)
+
+    blob = blob_store.fetch(url, image_processor.variant(kind), produce)
+    blob_store.place(blob, art_path / f"{kind}.png")
+
+# The pipeline stages (shared with the GUI) run on the functions above; one Scanner per run
+scanner = None
+
+def scan_stages(jobs):
+    global scanner
+    scanner = Scanner(extract_gameid_from_iso, lookup_game_name, find_game_in_metadata, fetch_sgdb_images,
+                      download_art, log=log)
+    return scanner.stages(jobs)
+
+# Watch mode: process images as they are added to the library until Ctrl+C (or SIGTERM).
+# Either signal only asks the loop to stop: a batch in progress winds down (games it hadn't
+# started are left for the next run) and the run ends through the normal summary and exit code.
+# Returns the finished jobs
+def watch_library(watcher, cache, stages, root_path, api_key, summary):
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        stop.set()
+
+    previous_handlers = {signum: signal.signal(signum, request_stop) for signum in (signal.SIGINT, signal.SIGTERM)}
+    log(f"Watching {', '.join(watcher.library.directories)} for new images ({watcher.method}), press Ctrl+C to stop")
+    finished_jobs = []
+    try:
+        while not stop.is_set():
+            added, removed = watcher.poll()
+            for filename in removed:
+                log(f"{filename} was removed from the library")
+                summary.remove(filename)
+            if not added or stop.is_set():
+                continue
+            log(f"New images in the library: {', '.join(library_file.name for library_file in added)}")
+            # Art lookups that were rate limited or found nothing are tried again, not reused for the session
+            scanner.forget_missing_art()
+            jobs = plan_jobs(cache, added, root_path, api_key, summary, log=log, library=watcher.library)
+            batch = process_jobs(jobs, stages, cache, stop_event=stop, log=log)
+            summary.add_jobs(batch)
+            finished_jobs.extend(batch)
+            log(f"Processed {len(batch)} new games, watching for more")
+    except KeyboardInterrupt:
+        # Only if the handlers above were bypassed; everything recorded so far is kept
+        pass
+    finally:
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
+        watcher.close()
+    log("Watch mode stopped")
+    return finished_jobs
+
+# Command line options
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fetch OSD-XMB artwork for PS2 ISOs.")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS,
+                        help=f"number of parallel workers per scan stage (default: {DEFAULT_JOBS})")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="minimum level written to the console and log file (default: INFO)")
+    parser.add_argument("--log-json", action="store_true",
+                        help="write the log file as JSON lines instead of plain text")
+    parser.add_argument("--icon-size", type=parse_size, default=DEFAULT_ART_SIZES["ICON0"], metavar="WxH",
+                        help="maximum ICON0.png size (default: %(default)s)")
+    parser.add_argument("--hero-size", type=parse_size, default=DEFAULT_ART_SIZES["PIC1"], metavar="WxH",
+                        help="maximum PIC1.png size (default: %(default)s)")
+    parser.add_argument("--quantize", action="store_true",
+                        help="reduce images to a 256-colour palette for smaller files")
+    parser.add_argument("--raw-images", action="store_true",
+                        help="save images exactly as downloaded, without PNG conversion or resizing")
+    parser.add_argument("--metadata-max-age", type=float, default=None, metavar="HOURS",
+                        help="hours before Metadata.zip is checked for updates again, 0 checks every run "
+                             f"(default: config.json \"metadata_max_age_hours\" or {DEFAULT_MAX_AGE_HOURS})")
+    parser.add_argument("--cache-server", metavar="URL",
+                        help="fetch everything through a LAN art cache, e.g. http://192.168.1.10:8765 "
+                             "(default: config.json \"cache_server\")")
+    parser.add_argument("--serve-cache", metavar="[HOST:]PORT", nargs="?", const=str(LAN_CACHE_PORT),
+                        help=f"run as a LAN art cache server instead of scanning (default: 127.0.0.1:{LAN_CACHE_PORT}, "
+                             "use 0.0.0.0:PORT to serve the LAN)")
+    parser.add_argument("--include", action="append", metavar="PATTERN",
+                        help="only scan images matching this glob, e.g. \"RPG/*\" or \"*(USA)*\"; repeatable "
+                             "(default: config.json \"include_patterns\")")
+    parser.add_argument("--exclude", action="append", metavar="PATTERN",
+                        help="skip images or whole folders matching this glob; repeatable "
+                             "(default: config.json \"exclude_patterns\")")
+    parser.add_argument("--report", default=REPORT_FILE, metavar="FILE",
+                        help="where the per-stage timing report is written as JSON (default: %(default)s)")
+    parser.add_argument("--profile", action="store_true",
+                        help="also capture cProfile and tracemalloc output for the scan (profile.pstats, profile.txt)")
+    parser.add_argument("--cache-dir", default=LAN_CACHE_DIR,
+                        help="where the art cache server stores responses (default: %(default)s)")
+
+    watch = parser.add_argument_group("watch mode", "keep running after the scan and process images as they are added")
+    watch.add_argument("--watch", action="store_true",
+                       help="watch the DVD and CD folders for new, renamed or removed images until Ctrl+C")
+    watch.add_argument("--watch-settle", type=float, default=DEFAULT_SETTLE_SECONDS, metavar="SECONDS",
+                       help="how long a new image's size must stay unchanged before it is opened (default: %(default)s)")
+    watch.add_argument("--watch-poll", action="store_true",
+                       help="poll instead of using inotify, e.g. for SMB/NFS shares written to by other machines")
+    watch.add_argument("--watch-interval", type=float, default=DEFAULT_POLL_SECONDS, metavar="SECONDS",
+                       help="seconds between folder rescans when polling (default: %(default)s)")
+
+    batch = parser.add_argument_group("headless runs", "options for scheduled runs without a console (cron, systemd timers)")
+    batch.add_argument("--headless", "--non-interactive", dest="headless", action="store_true",
+                       help="never prompt or clear the screen; settings come from these options and config.json")
+    batch.add_argument("--root", metavar="DIR",
+                       help="root directory containing the OSDXMB and DVD folders (default: saved config)")
+    batch.add_argument("--api-key", metavar="KEY",
+                       help="SteamGridDB API key (default: $STEAMGRIDDB_API_KEY, then saved config)")
+    batch.add_argument("--lang", choices=sorted(LANGUAGES),
+                       help="language for console messages (headless default: en)")
+    batch.add_argument("--exclude-failed", choices=["ask", "never", "always"], default=None,
+                       help="add games without art to the exclusion list (default: ask, or never when headless)")
+    batch.add_argument("--summary-json", metavar="FILE",
+                       help="also write the run summary as JSON to FILE")
+    args = parser.parse_args()
+    if args.exclude_failed is None:
+        args.exclude_failed = "never" if args.headless else "ask"
+    elif args.headless and args.exclude_failed == "ask":
+        parser.error("--exclude-failed ask needs a console, use never or always with --headless")
+    return args
+
+# Resolve the root directory and API key from options, the environment and the saved config.
+# Returns (root, api_key, from_options); root is None when nothing usable was given.
+def settings_from_args(args, config):
+    api_key = args.api_key or os.getenv("STEAMGRIDDB_API_KEY")
+    if args.headless:
+        return args.root or config.get("root_directory"), api_key or config.get("api_key"), True
+    if args.root:
+        return args.root, api_key, True
+    return None, api_key, False
+
+# Write the machine-readable run summary
+def write_summary_json(path, summary):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+
+# Stop before scanning, still leaving a summary for whoever scheduled the run
+def exit_setup_failed(summary_path, root, error):
+    if summary_path:
+        write_summary_json(summary_path, {"root": root, "exit_code": EXIT_SETUP_FAILED, "error": error})
+    sys.exit(EXIT_SETUP_FAILED)
+
+# Serve the LAN art cache until interrupted
+def serve_art_cache(address, directory):
+    host, port = parse_address(address)
+    server = ArtCacheServer(directory, host, port, log=log)
+    log(f"LAN art cache serving {directory} on {host}:{port}, press Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        log(f"LAN art cache stopped: {server.cache.stats}")
+
+# Main flow
+if __name__ == "__main__":
+    # Needed for the image process pool in frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
+
+    args = parse_args()
+    headless = args.headless
+    if args.serve_cache:
+        setup_logging(LOG_FILE, level=args.log_level, json_lines=args.log_json)
+        serve_art_cache(args.serve_cache, args.cache_dir)
+        sys.exit(0)
+
+    cache = ScanCache.load(CACHE_FILE)
+    config = load_config()
+    http_client.set_cache_server(args.cache_server or config.get("cache_server"))
+
+    # Clear screen at start
+    clear_screen()
+
+    # Choose language
+    if args.lang:
+        lang = args.lang
+    elif headless:
+        lang = "en"
+    else:
+        choice = input(LANGUAGES["pt"]["choose_lang"])
+        clear_screen()
+
+        if choice.strip() == "2":
+            lang = "en"
+        elif choice.strip() == "1":
+            lang = "pt"
+        else:
+            print(LANGUAGES["en"]["invalid_lang"])
+            lang = "en"
+
+    L = LANGUAGES[lang]
+
+    setup_logging(LOG_FILE, level=args.log_level, json_lines=args.log_json)
+
+    # Settings given as options (always the case when headless) skip the prompts below
+    root, api_key, use_saved = settings_from_args(args, config)
+    if headless and not root:
+        print(L["missing_root"])
+        log("[ERROR] No root directory: pass --root or save one in config.json")
+        exit_setup_failed(args.summary_json, None, "no root directory")
+
+    # Download Metadata.zip, or refresh it once it is older than the max age
+    max_age = args.metadata_max_age
+    if max_age is None:
+        max_age = config.get("metadata_max_age_hours", DEFAULT_MAX_AGE_HOURS)
+    print(L["downloading_metadata"])
+    if not download_metadata(max_age):
+        print(L["metadata_download_failed"])
+    clear_screen()  # Clear screen after metadata download
+
+    # Check if we have saved config and ask user if they want to use it
+    saved_root = config.get('root_directory')
+    saved_api_key = config.get('api_key')
+    
+    # Modified condition to only require root directory (API key is optional)
+    if not use_saved and saved_root and os.path.exists(saved_root):
+        try:
+            # Show masked API key for privacy
+            masked_api_key = saved_api_key if saved_api_key and len(saved_api_key) <= 5 else (saved_api_key[:5] + '...' if saved_api_key else 'None')
+            choice = input(L["use_saved_config"].format(saved_root=saved_root, saved_api_key=masked_api_key))
+            clear_screen()
+            if choice == "1":
+                use_saved = True
+                root = saved_root
+                # Same precedence as --api-key: option, then $STEAMGRIDDB_API_KEY, then saved
+                api_key = api_key or saved_api_key
+        except:
+            use_saved = False
+    
+    if not use_saved:
+        if not saved_root:
+            print(L["no_saved_config"])
+        
+        root = input(L["ask_root"])
+        clear_screen()
+        
+        # API key is now optional
+        api_key_prompted = not api_key
+        if api_key_prompted:
+            print(L["ask_api_key"][1])
+            api_key_input = input(L["api_key_optional"])
+            api_key = api_key_input if api_key_input.strip() else None
+            clear_screen()
+        
+        # Save the new configuration. Only a key typed here or given with --api-key is written;
+        # one from $STEAMGRIDDB_API_KEY stays out of config.json
+        config['root_directory'] = root
+        if api_key_prompted or args.api_key:
+            config['api_key'] = api_key
+        save_config(config)
+        print(L["config_saved"])
+
+    root_path = Path(root)
+
+    if not (root_path / "OSDXMB").exists() or not (root_path / "DVD").exists():
+        print(L["missing_folders"])
+        exit_setup_failed(args.summary_json, str(root_path), "missing OSDXMB or DVD folder")
+
+    print(L["process_start"])
+    log("=== PS2 ISO Scan Started ===")
+    tracer.reset()
+    profiler = Profiler() if args.profile else None
+    if profiler:
+        profiler.start()
+
+    # ISO/CSO/ZSO/CHD files anywhere under DVD and CD, filtered by the include/exclude patterns
+    library = Library(root_path, include=args.include or config.get("include_patterns", []),
+                      exclude=args.exclude or config.get("exclude_patterns", []), log=log)
+
+    # Started before the first scan, so images added while it runs are picked up afterwards
+    watcher = None
+    if args.watch:
+        watcher = LibraryWatcher(library, settle=args.watch_settle, poll_interval=args.watch_interval,
+                                 use_inotify=not args.watch_poll, log=log)
+
+    # One keep-alive connection per worker and host
+    http_client.configure(pool_size=args.jobs * 2)
+    image_processor = ImageProcessor(sizes={"ICON0": args.icon_size, "PIC1": args.hero_size},
+                                     quantize=args.quantize, enabled=not args.raw_images, log=log)
+    blob_store = BlobStore()
+
+    stages = scan_stages(args.jobs)
+    if profiler:
+        for stage in stages:
+            stage.func = profiler.wrap(stage.func)
+
+    # Library entries stream through the cache check into the pipeline as the folders are walked
+    # Every image that wasn't excluded ends up in the summary once, as a success or a failure
+    summary = ScanSummary()
+    jobs = plan_jobs(cache, library.scan(), root_path, api_key, summary, log=log, library=library)
+    finished_jobs = process_jobs(jobs, stages, cache, log=log)
+    summary.add_jobs(finished_jobs)
+
+    if watcher:
+        finished_jobs += watch_library(watcher, cache, stages, root_path, api_key, summary)
+    total_isos = len(summary)
+    successful_games, failed_games, failed_files = summary.successful_games, summary.failed_games, summary.failed_files
+
+    image_processor.shutdown()
+    log(f"Resolved art for {len(scanner.art_groups)} titles across {len(finished_jobs)} games")
+    log(blob_store.summary())
+    blob_store.close()
+    if sgdb_client is not None:
+        sgdb_client.cache.close()
+
+    # Where the time went: per-stage latencies and counters, in the log file and as JSON
+    report = tracer.write_report(args.report)
+    for line in tracer.format_report(report).splitlines():
+        write_log(line)
+    log(f"Scan report written to {args.report}")
+    if profiler:
+        log(f"Profile written to {profiler.stop()}")
+
+    log("=== PS2 ISO Scan Finished ===")
+    print(L["process_end"])
+    
+    # Ask user if they want to add failed games to exclusion list
+    excluded = []
+    if failed_files and args.exclude_failed != "never":
+        if args.exclude_failed == "always" or input(L["exclude_prompt"]).strip() == "1":
+            # Throttled games are only rate limited, not missing art; they are retried next run
+            throttled = set(summary.throttled_files)
+            excluded = [filename for filename in failed_files if filename not in throttled]
+            for filename in excluded:
+                cache.exclude(filename)
+            
+            cache.commit()
+            print(L["excluded_added"])
+    cache.close()
+
+    exit_code = EXIT_GAMES_FAILED if failed_games else EXIT_OK
+    if args.summary_json:
+        write_summary_json(args.summary_json, {
+            "root": str(root_path),
+            "exit_code": exit_code,
+            "total": total_isos,
+            "succeeded": len(successful_games),
+            "failed": len(failed_games),
+            "throttled": len(summary.throttled_files),
+            "excluded": excluded,
+            "successful_games": successful_games,
+            "failed_games": failed_games,
+            "report": args.report,
+        })
+    
+    # Display summary
+    clear_screen()
+    print(L["summary_title"])
+    print()
+    print(L["total_processed"].format(total_isos))
+    print(L["success_count"].format(len(successful_games)))
+    print(L["failed_count"].format(len(failed_games)))
+    print()
+    
+    if successful_games:
+        print(L["successful_games"])
+        for game in successful_games:
+            print(f"  ✓ {game}")
+        print()
+    
+    if failed_games:
+        print(L["failed_games"])
+        for game in failed_games:
+            print(f"  ✗ {game}")
+        print()
+    
+    # Wait for user input before closing
+    if not headless:
+        input(L["press_any_key"])
+        clear_screen()
+    sys.exit(exit_code)
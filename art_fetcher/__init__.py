@@ -0,0 +1 @@
+"""Shared backend used by both the CLI script and the GUI."""
@@ -0,0 +1,145 @@
+import os
+import shutil
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from collections import defaultdict
+from .tracing import count
+
+BLOB_DIR = "art_blobs"
+BLOB_INDEX = "index.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    url TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (url, variant)
+);
+"""
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BlobStore:
+    """Content-addressed store for finished ICON0/PIC1 files.
+
+    Blobs are named by the SHA-256 of their content, and `sources` maps
+    (url, variant) to a blob, where the variant captures the conversion
+    settings. An image shared by several GameIDs (multi-disc sets, regional
+    releases) is downloaded and converted once, then hardlinked into each
+    ART folder, or copied when the target drive can't hold hardlinks
+    (FAT32/exFAT, another device).
+    """
+
+    def __init__(self, directory=BLOB_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(directory, BLOB_INDEX), check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.url_locks = defaultdict(threading.Lock)
+        self.stats = {"downloaded": 0, "reused": 0, "linked": 0, "copied": 0,
+                      "reused_bytes": 0, "linked_bytes": 0}
+
+    def blob_path(self, digest):
+        return os.path.join(self.directory, digest[:2], digest + ".png")
+
+    def _count(self, **amounts):
+        with self.lock:
+            for key, amount in amounts.items():
+                self.stats[key] += amount
+
+    def lookup(self, url, variant):
+        """Path of the stored blob for a URL and variant, or None."""
+        with self.lock:
+            row = self.conn.execute("SELECT digest FROM sources WHERE url = ? AND variant = ?", (url, variant)).fetchone()
+        if row is None:
+            return None
+        path = self.blob_path(row[0])
+        return path if os.path.exists(path) else None
+
+    def add(self, url, variant, path):
+        """Move a finished file into the store and return its blob path.
+
+        If a blob with the same content already exists the file is dropped,
+        so different URLs serving identical bytes share one blob.
+        """
+        digest = file_digest(path)
+        blob = self.blob_path(digest)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        if os.path.exists(blob):
+            os.remove(path)
+        else:
+            os.replace(path, blob)
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?)", (url, variant, digest))
+            self.conn.commit()
+        return blob
+
+    def fetch(self, url, variant, produce):
+        """Return the blob for (url, variant), calling `produce(staging_path)`
+        to download and convert it only on a miss. Concurrent calls for the
+        same URL wait for the first one instead of downloading it twice."""
+        with self.lock:
+            url_lock = self.url_locks[(url, variant)]
+        with url_lock:
+            blob = self.lookup(url, variant)
+            if blob is not None:
+                count("art_store_hits")
+                self._count(reused=1, reused_bytes=os.path.getsize(blob))
+                return blob
+            count("art_store_misses")
+            fd, staging = tempfile.mkstemp(dir=self.directory, prefix=".", suffix=".png")
+            os.close(fd)
+            try:
+                produce(staging)
+                blob = self.add(url, variant, staging)
+            finally:
+                if os.path.exists(staging):
+                    os.remove(staging)
+            self._count(downloaded=1)
+            return blob
+
+    def place(self, blob, dest):
+        """Put a blob at `dest`, atomically: hardlink when possible, copy otherwise."""
+        dest = str(dest)
+        if os.path.exists(dest) and os.path.samefile(blob, dest):
+            self._count(linked_bytes=os.path.getsize(blob))
+            return
+        # A unique temp name: jobs for the same GameID (e.g. one dump in DVD and CD) may place the same file at once
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dest), prefix=".", suffix=".tmp")
+        os.close(fd)
+        try:
+            try:
+                os.remove(tmp_path)  # link() needs a free name
+                os.link(blob, tmp_path)
+                self._count(linked=1, linked_bytes=os.path.getsize(blob))
+            except OSError:
+                shutil.copyfile(blob, tmp_path)
+                self._count(copied=1)
+            os.replace(tmp_path, dest)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def summary(self):
+        stats = self.stats
+        return (f"Art store: {stats['downloaded']} images downloaded, {stats['reused']} reused "
+                f"({stats['reused_bytes'] / 1048576:.1f} MB not fetched again), "
+                f"{stats['linked']} hardlinked, {stats['copied']} copied "
+                f"({stats['linked_bytes'] / 1048576:.1f} MB shared through hardlinks)")
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
@@ -0,0 +1,484 @@
+"""Block-level readers for compressed disc images (CSO, ZSO and CHD).
+
+Each reader exposes the same `read(offset, size)` interface as the plain
+file reader, but only fetches and decompresses the blocks that overlap the
+requested range, so identifying a 4 GB image costs a few small reads.
+"""
+import lzma
+import struct
+import zlib
+from collections import OrderedDict
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class CompressedImageError(Exception):
+    pass
+
+
+class _BlockReader:
+    """Common block lookup/caching for the compressed formats."""
+
+    cache_blocks = 8
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.blocks = OrderedDict()
+
+    def _read_raw(self, offset, size):
+        self.file.seek(offset)
+        return self.file.read(size)
+
+    def _block(self, index):
+        if index in self.blocks:
+            self.blocks.move_to_end(index)
+            return self.blocks[index]
+        data = self.decompress_block(index)
+        self.blocks[index] = data
+        if len(self.blocks) > self.cache_blocks:
+            self.blocks.popitem(last=False)
+        return data
+
+    def read(self, offset, size):
+        size = max(0, min(size, self.total_bytes - offset))
+        chunks = []
+        while size > 0:
+            index, start = divmod(offset, self.block_size)
+            data = self._block(index)[start:start + size]
+            if not data:
+                break
+            chunks.append(data)
+            offset += len(data)
+            size -= len(data)
+        return b"".join(chunks)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def lz4_block_decompress(src, max_size):
+    """Decompress a raw LZ4 block (no frame header)."""
+    dst = bytearray()
+    pos, end = 0, len(src)
+    while pos < end:
+        token = src[pos]
+        pos += 1
+        length = token >> 4
+        if length == 15:
+            while True:
+                extra = src[pos]
+                pos += 1
+                length += extra
+                if extra != 255:
+                    break
+        dst += src[pos:pos + length]
+        pos += length
+        if pos >= end or len(dst) >= max_size:
+            break
+        distance = src[pos] | (src[pos + 1] << 8)
+        pos += 2
+        if distance == 0 or distance > len(dst):
+            raise CompressedImageError("Invalid LZ4 match offset")
+        length = token & 0x0F
+        if length == 15:
+            while True:
+                extra = src[pos]
+                pos += 1
+                length += extra
+                if extra != 255:
+                    break
+        length += 4
+        start = len(dst) - distance
+        if length <= distance:
+            dst += dst[start:start + length]
+        else:
+            # Overlapping match: copy byte by byte semantics
+            for i in range(length):
+                dst.append(dst[start + i])
+    return bytes(dst[:max_size])
+
+
+class CsoReader(_BlockReader):
+    """CISO (v1/v2) and ZISO images: a header, a block index, then blocks.
+
+    CSO v1 blocks are raw deflate, ZSO blocks are raw LZ4 and CSO v2 may
+    use either. The high bit of an index entry flags a stored block (or
+    an LZ4 block in CSO v2).
+    """
+
+    HEADER_SIZE = 24
+
+    def __init__(self, path):
+        super().__init__(path)
+        header = self._read_raw(0, self.HEADER_SIZE)
+        if len(header) < self.HEADER_SIZE or header[:4] not in (b"CISO", b"ZISO"):
+            self.close()
+            raise CompressedImageError("Not a CSO/ZSO image")
+        self.magic = header[:4]
+        _, self.total_bytes, self.block_size, self.version, self.align = struct.unpack_from("<IQIBB", header, 4)
+        if not self.block_size:
+            self.close()
+            raise CompressedImageError("Invalid CSO block size")
+
+    def _index_entries(self, index):
+        return struct.unpack("<II", self._read_raw(self.HEADER_SIZE + index * 4, 8))
+
+    def decompress_block(self, index):
+        entry, next_entry = self._index_entries(index)
+        flag = entry & 0x80000000
+        offset = (entry & 0x7FFFFFFF) << self.align
+        size = ((next_entry & 0x7FFFFFFF) << self.align) - offset
+        raw = self._read_raw(offset, size)
+
+        if self.magic == b"ZISO":
+            if flag:
+                return raw[:self.block_size]
+            return lz4_block_decompress(raw, self.block_size)
+        if self.version >= 2:
+            if size >= self.block_size:
+                return raw[:self.block_size]
+            if flag:
+                return lz4_block_decompress(raw, self.block_size)
+        elif flag:
+            return raw[:self.block_size]
+        return zlib.decompressobj(-15).decompress(raw, self.block_size)
+
+
+class BitReader:
+    """MSB-first bit reader, as used by CHD's map and Huffman streams."""
+
+    def __init__(self, data):
+        self.data = data
+        self.byte_pos = 0
+        self.buffer = 0
+        self.bits = 0
+
+    def peek(self, count):
+        while self.bits < count:
+            # Reading past the end yields zero bits, like MAME's bitstream
+            byte = self.data[self.byte_pos] if self.byte_pos < len(self.data) else 0
+            self.byte_pos += 1
+            self.buffer = (self.buffer << 8) | byte
+            self.bits += 8
+        return (self.buffer >> (self.bits - count)) & ((1 << count) - 1)
+
+    def skip(self, count):
+        self.bits -= count
+        self.buffer &= (1 << self.bits) - 1
+
+    def read(self, count):
+        if count == 0:
+            return 0
+        value = self.peek(count)
+        self.skip(count)
+        return value
+
+
+class HuffmanDecoder:
+    """Canonical Huffman decoder matching MAME's huffman_decoder."""
+
+    def __init__(self, numcodes, maxbits):
+        self.numcodes = numcodes
+        self.maxbits = maxbits
+        self.lengths = [0] * numcodes
+        self.lookup = None
+
+    def import_tree_rle(self, bits):
+        numbits = 5 if self.maxbits >= 16 else 4 if self.maxbits >= 8 else 3
+        current = 0
+        while current < self.numcodes:
+            nodebits = bits.read(numbits)
+            if nodebits != 1:
+                self.lengths[current] = nodebits
+                current += 1
+                continue
+            nodebits = bits.read(numbits)
+            if nodebits == 1:
+                self.lengths[current] = nodebits
+                current += 1
+                continue
+            repcount = bits.read(numbits) + 3
+            if current + repcount > self.numcodes:
+                raise CompressedImageError("Invalid Huffman tree")
+            for _ in range(repcount):
+                self.lengths[current] = nodebits
+                current += 1
+        self.assign_canonical_codes()
+
+    def import_tree_huffman(self, bits):
+        small = HuffmanDecoder(24, 6)
+        small.lengths[0] = bits.read(3)
+        start = bits.read(3) + 1
+        count = 0
+        for index in range(1, 24):
+            if index < start or count == 7:
+                small.lengths[index] = 0
+            else:
+                count = bits.read(3)
+                small.lengths[index] = 0 if count == 7 else count
+        small.assign_canonical_codes()
+
+        temp = self.numcodes - 9
+        rlefullbits = 0
+        while temp:
+            temp >>= 1
+            rlefullbits += 1
+
+        last = 0
+        current = 0
+        while current < self.numcodes:
+            value = small.decode_one(bits)
+            if value != 0:
+                last = value - 1
+                self.lengths[current] = last
+                current += 1
+            else:
+                count = bits.read(3) + 2
+                if count == 7 + 2:
+                    count += bits.read(rlefullbits)
+                while count and current < self.numcodes:
+                    self.lengths[current] = last
+                    current += 1
+                    count -= 1
+        self.assign_canonical_codes()
+
+    def assign_canonical_codes(self):
+        histogram = [0] * 33
+        for length in self.lengths:
+            if length > self.maxbits:
+                raise CompressedImageError("Invalid Huffman code length")
+            histogram[length] += 1
+        start = 0
+        for length in range(32, 0, -1):
+            nextstart = (start + histogram[length]) >> 1
+            if length != 1 and nextstart * 2 != start + histogram[length]:
+                raise CompressedImageError("Incomplete Huffman tree")
+            histogram[length] = start
+            start = nextstart
+        # Table indexed by the next maxbits bits -> (symbol, code length)
+        self.lookup = [None] * (1 << self.maxbits)
+        for symbol, length in enumerate(self.lengths):
+            if length > 0:
+                code = histogram[length]
+                histogram[length] += 1
+                shift = self.maxbits - length
+                entry = (symbol, length)
+                for index in range(code << shift, (code + 1) << shift):
+                    self.lookup[index] = entry
+
+    def decode_one(self, bits):
+        entry = self.lookup[bits.peek(self.maxbits)]
+        if entry is None:
+            raise CompressedImageError("Invalid Huffman code")
+        bits.skip(entry[1])
+        return entry[0]
+
+
+# CHD v5 map compression types
+CHD_CODEC_0, CHD_CODEC_3 = 0, 3
+CHD_NONE, CHD_SELF, CHD_PARENT = 4, 5, 6
+CHD_RLE_SMALL, CHD_RLE_LARGE = 7, 8
+CHD_SELF_0, CHD_SELF_1 = 9, 10
+CHD_PARENT_SELF, CHD_PARENT_0, CHD_PARENT_1 = 11, 12, 13
+
+CD_FRAME_SIZE = 2448
+CD_SECTOR_SIZE = 2352
+CD_SUBCODE_SIZE = 96
+
+
+class ChdReader(_BlockReader):
+    """MAME CHD v5 images (as written by chdman createdvd/createcd).
+
+    Supports the zlib, lzma, huff and zstd codecs and their CD variants
+    (cdzl, cdlz, cdzs). Only the map entries and hunks that are actually
+    read get decoded.
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        header = self._read_raw(0, 124)
+        if header[:8] != b"MComprHD":
+            self.close()
+            raise CompressedImageError("Not a CHD image")
+        version, = struct.unpack_from(">I", header, 12)
+        if version != 5:
+            self.close()
+            raise CompressedImageError(f"Unsupported CHD version {version}")
+        self.compressors = [header[16 + i * 4:20 + i * 4] for i in range(4)]
+        self.total_bytes, self.map_offset = struct.unpack_from(">QQ", header, 32)
+        self.block_size, self.unit_bytes = struct.unpack_from(">II", header, 56)
+        self.hunk_count = (self.total_bytes + self.block_size - 1) // self.block_size
+        self.compressed = self.compressors[0] != b"\0\0\0\0"
+        self.map = None
+
+    def _load_map(self):
+        """Decode the per-hunk compression types.
+
+        The types come first in the map bitstream; the offsets that follow
+        are cumulative, so they are decoded lazily by _map_entry only as far
+        as the hunks actually being read.
+        """
+        if self.map is not None:
+            return
+        self.map = []
+        if not self.compressed:
+            return
+
+        header = self._read_raw(self.map_offset, 16)
+        map_bytes, = struct.unpack_from(">I", header, 0)
+        self.map_next_offset = int.from_bytes(header[4:10], "big")
+        self.map_bits = header[12], header[13], header[14]
+        self.map_stream = BitReader(self._read_raw(self.map_offset + 16, map_bytes))
+        decoder = HuffmanDecoder(16, 8)
+        decoder.import_tree_rle(self.map_stream)
+
+        types = bytearray()
+        last_type, repcount = 0, 0
+        for _ in range(self.hunk_count):
+            if repcount > 0:
+                types.append(last_type)
+                repcount -= 1
+                continue
+            value = decoder.decode_one(self.map_stream)
+            if value == CHD_RLE_SMALL:
+                types.append(last_type)
+                repcount = 2 + decoder.decode_one(self.map_stream)
+            elif value == CHD_RLE_LARGE:
+                types.append(last_type)
+                repcount = 2 + 16 + (decoder.decode_one(self.map_stream) << 4)
+                repcount += decoder.decode_one(self.map_stream)
+            else:
+                types.append(value)
+                last_type = value
+        self.map_types = types
+        self.last_self, self.last_parent = 0, 0
+
+    def _map_entry(self, index):
+        """Return (kind, length, offset) for a hunk."""
+        self._load_map()
+        if not self.compressed:
+            offset, = struct.unpack(">I", self._read_raw(self.map_offset + index * 4, 4))
+            return CHD_NONE, self.block_size, offset * self.block_size
+
+        length_bits, self_bits, parent_bits = self.map_bits
+        bits = self.map_stream
+        while len(self.map) <= index:
+            hunk = len(self.map)
+            kind = self.map_types[hunk]
+            offset, length = self.map_next_offset, 0
+            if CHD_CODEC_0 <= kind <= CHD_CODEC_3:
+                length = bits.read(length_bits)
+                self.map_next_offset += length
+                bits.read(16)
+            elif kind == CHD_NONE:
+                length = self.block_size
+                self.map_next_offset += length
+                bits.read(16)
+            elif kind == CHD_SELF:
+                offset = self.last_self = bits.read(self_bits)
+            elif kind == CHD_PARENT:
+                offset = self.last_parent = bits.read(parent_bits)
+            elif kind in (CHD_SELF_0, CHD_SELF_1):
+                if kind == CHD_SELF_1:
+                    self.last_self += 1
+                kind, offset = CHD_SELF, self.last_self
+            elif kind == CHD_PARENT_SELF:
+                kind = CHD_PARENT
+                offset = self.last_parent = hunk * self.block_size // self.unit_bytes
+            elif kind in (CHD_PARENT_0, CHD_PARENT_1):
+                if kind == CHD_PARENT_1:
+                    self.last_parent += self.block_size // self.unit_bytes
+                kind, offset = CHD_PARENT, self.last_parent
+            self.map.append((kind, length, offset))
+        return self.map[index]
+
+    def decompress_block(self, index):
+        kind, length, offset = self._map_entry(index)
+        if kind == CHD_NONE:
+            if offset == 0 and not self.compressed:
+                return bytes(self.block_size)
+            return self._read_raw(offset, self.block_size)
+        if kind == CHD_SELF:
+            return self._block(offset)
+        if kind == CHD_PARENT:
+            raise CompressedImageError("CHD images with a parent are not supported")
+        codec = self.compressors[kind]
+        return self._decode(codec, self._read_raw(offset, length), self.block_size)
+
+    def _decode(self, codec, data, size):
+        if codec == b"zlib":
+            return zlib.decompressobj(-15).decompress(data, size)
+        if codec == b"lzma":
+            return _lzma_decompress(data, size)
+        if codec == b"zstd":
+            return _zstd_decompress(data, size)
+        if codec == b"huff":
+            decoder = HuffmanDecoder(256, 16)
+            bits = BitReader(data)
+            decoder.import_tree_huffman(bits)
+            return bytes(decoder.decode_one(bits) for _ in range(size))
+        if codec in (b"cdzl", b"cdlz", b"cdzs"):
+            return self._decode_cd(codec, data, size)
+        raise CompressedImageError(f"Unsupported CHD codec {codec.decode('ascii', 'replace')}")
+
+    def _decode_cd(self, codec, data, size):
+        # Sector data and subcode are compressed separately; ECC bits mark
+        # frames whose sync/ECC bytes were stripped, which doesn't affect
+        # the user data we read.
+        frames = size // CD_FRAME_SIZE
+        complen_bytes = 2 if size < 65536 else 3
+        ecc_bytes = (frames + 7) // 8
+        header_bytes = ecc_bytes + complen_bytes
+        base_length = int.from_bytes(data[ecc_bytes:header_bytes], "big")
+        base_codec = {b"cdzl": b"zlib", b"cdlz": b"lzma", b"cdzs": b"zstd"}[codec]
+        sub_codec = b"zstd" if codec == b"cdzs" else b"zlib"
+        sectors = self._decode(base_codec, data[header_bytes:header_bytes + base_length], frames * CD_SECTOR_SIZE)
+        subcode = self._decode(sub_codec, data[header_bytes + base_length:], frames * CD_SUBCODE_SIZE)
+        out = bytearray()
+        for frame in range(frames):
+            out += sectors[frame * CD_SECTOR_SIZE:(frame + 1) * CD_SECTOR_SIZE]
+            out += subcode[frame * CD_SUBCODE_SIZE:(frame + 1) * CD_SUBCODE_SIZE].ljust(CD_SUBCODE_SIZE, b"\0")
+        return bytes(out)
+
+
+def _lzma_decompress(data, size):
+    # CHD stores raw LZMA1 data with lc=3, lp=0, pb=2; any dictionary at
+    # least as large as the hunk decodes it
+    dict_size = 1 << max(12, (size - 1).bit_length())
+    decompressor = lzma.LZMADecompressor(format=lzma.FORMAT_RAW, filters=[
+        {"id": lzma.FILTER_LZMA1, "dict_size": dict_size, "lc": 3, "lp": 0, "pb": 2}])
+    return decompressor.decompress(data, size)
+
+
+def _zstd_decompress(data, size):
+    if zstandard is None:
+        raise CompressedImageError("zstd-compressed CHD requires the 'zstandard' package")
+    return zstandard.ZstdDecompressor().decompressobj().decompress(data)[:size]
+
+
+MAGIC_READERS = (
+    (b"CISO", CsoReader),
+    (b"ZISO", CsoReader),
+    (b"MComprHD", ChdReader),
+)
+
+
+def open_compressed(path):
+    """Return a block reader for a compressed image, or None for other files."""
+    with open(path, "rb") as f:
+        magic = f.read(8)
+    for prefix, reader in MAGIC_READERS:
+        if magic.startswith(prefix):
+            return reader(path)
+    return None
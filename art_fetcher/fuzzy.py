@@ -0,0 +1,101 @@
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+# Trailing disc markers such as " (Disc 1)", " [Disc 2]" or " - CD 1"
+_DISC_SUFFIX = re.compile(r"[\s\-:]*[\(\[]?\s*(?:disc|disk|cd)\s*[0-9ivx]+(?:\s*of\s*\d+)?\s*[\)\]]?\s*$",
+                          re.IGNORECASE)
+
+
+# Lowercase and collapse punctuation/whitespace so "Tekken 4" and "TEKKEN-4" share trigrams
+def normalize_title(title):
+    return _NON_ALNUM.sub(" ", title.lower()).strip()
+
+
+# Title shared by every disc of a multi-disc set
+def strip_disc_suffix(title):
+    return _DISC_SUFFIX.sub("", title).strip() or title
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleMatcher:
+    """Fuzzy title matcher backed by a character-trigram inverted index.
+
+    A lookup only scores titles that share trigrams with the query, best
+    overlap first, instead of running SequenceMatcher over every title.
+    Scores are the same SequenceMatcher ratio the full scan used, so the
+    threshold keeps its meaning.
+
+    Limiting a lookup to the `max_candidates` best trigram overlaps is a
+    heuristic: trigram overlap only approximates SequenceMatcher's ratio,
+    so a title below the cut can occasionally score higher than the one
+    returned. When the cut would split titles that tie on overlap (such as
+    titles that differ only in punctuation), every candidate is scored.
+    """
+
+    def __init__(self, titles, max_candidates=200):
+        # titles: iterable of (key, title) pairs, in priority order for ties
+        self.keys = []
+        self.titles = []
+        self.lowered = []
+        self.gram_counts = []
+        self.postings = defaultdict(list)
+        self.max_candidates = max_candidates
+        for key, title in titles:
+            position = len(self.keys)
+            self.keys.append(key)
+            self.titles.append(title)
+            self.lowered.append(title.lower())
+            grams = trigrams(normalize_title(title))
+            self.gram_counts.append(len(grams))
+            for gram in grams:
+                self.postings[gram].append(position)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def candidates(self, query, threshold=0.7):
+        """Positions of the titles worth scoring, most similar trigram sets first."""
+        grams = trigrams(normalize_title(query))
+        counts = defaultdict(int)
+        for gram in grams:
+            for position in self.postings.get(gram, ()):
+                counts[position] += 1
+        query_length = len(query)
+        ranked = []
+        for position, shared in counts.items():
+            # SequenceMatcher's ratio can never exceed this length bound
+            title_length = len(self.lowered[position])
+            if 2 * min(query_length, title_length) / (query_length + title_length) <= threshold:
+                continue
+            dice = 2 * shared / (len(grams) + self.gram_counts[position])
+            ranked.append((-dice, position))
+        ranked.sort()
+        if len(ranked) > self.max_candidates and ranked[self.max_candidates][0] == ranked[self.max_candidates - 1][0]:
+            # The cut would keep some titles of a tie and drop the others
+            return [position for _, position in ranked]
+        return [position for _, position in ranked[:self.max_candidates]]
+
+    def best_match(self, query, threshold=0.7):
+        """Return (key, title, score) for the best title scoring above threshold, or None."""
+        query_lower = query.lower()
+        if not query_lower:
+            return None
+        best_position, best_score = None, 0
+        # Score candidates in original order so ties resolve like the full scan did
+        for position in sorted(self.candidates(query, threshold)):
+            candidate = self.lowered[position]
+            if 2 * min(len(query_lower), len(candidate)) / (len(query_lower) + len(candidate)) <= best_score:
+                continue
+            score = SequenceMatcher(None, query_lower, candidate).ratio()
+            if score > best_score and score > threshold:
+                best_position, best_score = position, score
+        if best_position is None:
+            return None
+        return self.keys[best_position], self.titles[best_position], best_score
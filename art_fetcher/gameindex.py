@@ -0,0 +1,102 @@
+import os
+import json
+from . import http_client
+from .tracing import traced
+
+GAMEINDEX_URL = "https://raw.githubusercontent.com/PCSX2/pcsx2/refs/heads/master/bin/resources/GameIndex.yaml"
+GAMEINDEX_INDEX_FILE = "gameindex.json"
+
+# Create a clean GameID for GameIndex.yaml lookup
+def clean_gameid_for_lookup(gameid):
+    # Remove dots and replace underscores with hyphens for GameIndex.yaml lookup
+    return gameid.replace('.', '').replace('_', '-')
+
+
+# Reduce the full GameIndex.yaml to a plain serial -> name dictionary
+def parse_gameindex(text):
+    # PyYAML is only needed when the index is rebuilt, so it is imported here
+    import yaml
+    # Use the libyaml loader when PyYAML was built with it, it is much faster
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    data = yaml.load(text, Loader=loader) or {}
+    names = {}
+    for serial, entry in data.items():
+        if isinstance(entry, dict) and entry.get("name"):
+            names[str(serial)] = str(entry["name"])
+    return names
+
+
+class GameIndex:
+    """Persistent serial -> name index built from PCSX2's GameIndex.yaml.
+
+    The compact index is stored in GAMEINDEX_INDEX_FILE together with the
+    ETag/Last-Modified of the upstream file, so a refresh is a single
+    conditional request and the YAML is only parsed again when it changed.
+    """
+
+    def __init__(self, path=GAMEINDEX_INDEX_FILE, url=GAMEINDEX_URL, log=print):
+        self.path = path
+        self.url = url
+        self.log = log
+        self.names = {}
+        self.etag = None
+        self.last_modified = None
+
+    def load_local(self):
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.names = data.get("names", {})
+            self.etag = data.get("etag")
+            self.last_modified = data.get("last_modified")
+            return True
+        except (json.JSONDecodeError, OSError, AttributeError):
+            self.names = {}
+            return False
+
+    def save_local(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"etag": self.etag, "last_modified": self.last_modified, "names": self.names},
+                      f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    @traced("gameindex_refresh")
+    def refresh(self):
+        """Fetch GameIndex.yaml only if upstream changed since the last build."""
+        headers = {}
+        if self.names:
+            if self.etag:
+                headers["If-None-Match"] = self.etag
+            if self.last_modified:
+                headers["If-Modified-Since"] = self.last_modified
+        try:
+            r = http_client.get(self.url, headers=headers)
+            if r.status_code == 304:
+                self.log("GameIndex.yaml unchanged, using local index.")
+                return True
+            if r.status_code != 200:
+                self.log(f"[ERROR] Failed to fetch GameIndex.yaml (status {r.status_code})")
+                return False
+            self.names = parse_gameindex(r.text)
+            self.etag = r.headers.get("ETag")
+            self.last_modified = r.headers.get("Last-Modified")
+            self.save_local()
+            self.log(f"Built GameIndex index with {len(self.names)} entries.")
+            return True
+        except Exception as e:
+            self.log(f"[ERROR] Failed to refresh GameIndex.yaml: {e}")
+            return False
+
+    def load(self, refresh=True):
+        """Load the local index and bring it up to date; falls back to the
+        local copy when the network is unavailable."""
+        self.load_local()
+        if refresh:
+            self.refresh()
+        return bool(self.names)
+
+    def lookup(self, gameid):
+        return self.names.get(clean_gameid_for_lookup(gameid))
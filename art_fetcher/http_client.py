@@ -0,0 +1,212 @@
+import os
+import time
+import tempfile
+import threading
+from email.utils import parsedate_to_datetime
+from urllib.parse import quote
+from .logger import write_log
+from .tracing import count, span
+
+# (connect, read) timeouts in seconds, so a stalled socket can't hang a scan
+DEFAULT_TIMEOUT = (10, 60)
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+DEFAULT_POOL_SIZE = 16
+RETRY_STATUSES = (500, 502, 503, 504)
+USER_AGENT = "PS2-OSD-XMB-Art-Fetcher"
+CHUNK_SIZE = 64 * 1024
+
+# Through a LAN cache the first byte can take as long as the server's own
+# upstream download (e.g. Metadata.zip), so allow a longer read timeout
+CACHE_SERVER_TIMEOUT = (10, 600)
+
+_session = None
+_session_lock = threading.Lock()
+_pool_size = DEFAULT_POOL_SIZE
+_cache_server = None
+
+
+def create_session(pool_size=DEFAULT_POOL_SIZE, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+    """Session with per-host keep-alive pools and exponential backoff on
+    connection errors and 5xx responses."""
+    # requests is imported on first use so the GUI window doesn't wait for it
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.headers["User-Agent"] = USER_AGENT
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def configure(pool_size=DEFAULT_POOL_SIZE):
+    """Resize the shared connection pools, e.g. to match the worker count."""
+    global _session, _pool_size
+    with _session_lock:
+        _pool_size = max(1, pool_size)
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session(_pool_size)
+        return _session
+
+
+def set_cache_server(url):
+    """Send every request through a LAN art cache server (see lan_cache), or
+    straight upstream again with None."""
+    global _cache_server
+    _cache_server = url.rstrip("/") if url else None
+
+
+def cache_server_url(url):
+    return f"{_cache_server}/fetch?url={quote(url, safe='')}"
+
+
+def get(url, timeout=DEFAULT_TIMEOUT, use_cache_server=True, **kwargs):
+    """GET through the shared pooled session with default timeouts.
+
+    With a cache server configured the request goes through it; if the
+    server can't be reached it is dropped for the rest of the run and the
+    request goes upstream directly.
+    """
+    global _cache_server
+    count("http_requests")
+    server = _cache_server if use_cache_server else None
+    if server is not None and not url.startswith(server):
+        import requests
+        try:
+            return get_session().get(cache_server_url(url), timeout=CACHE_SERVER_TIMEOUT, **kwargs)
+        except requests.ConnectionError as e:
+            write_log(f"[WARN] LAN art cache {server} unreachable ({e}), fetching directly")
+            _cache_server = None
+    return get_session().get(url, timeout=timeout, **kwargs)
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests per second with bursts of
+    up to `burst`. Every worker calls acquire() before a request, so the
+    whole process stays under the limit however many threads are running.
+    pause() holds everyone back, e.g. after a 429 with Retry-After.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now >= self.paused_until:
+                    self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+                else:
+                    wait = self.paused_until - now
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+            self.updated = self.paused_until
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class DownloadError(Exception):
+    pass
+
+
+def download_to_temp(url, directory, max_bytes=None, content_types=None, check_header=None,
+                     chunk_size=CHUNK_SIZE, **kwargs):
+    """Stream a response body into a temporary file inside `directory`.
+
+    The body is never held in memory. The download is rejected (and the
+    temp file removed) on a non-200 status, an unexpected Content-Type,
+    a body larger than `max_bytes`, or when `check_header(first_chunk)`
+    returns False. Returns the temp file path; the caller moves it into
+    place with os.replace, which is atomic within the same directory.
+    """
+    with span("download_file"), get(url, stream=True, **kwargs) as r:
+        if r.status_code != 200:
+            raise DownloadError(f"status {r.status_code}")
+        content_type = r.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if content_types and content_type and not content_type.startswith(content_types):
+            raise DownloadError(f"unexpected content type {content_type}")
+        return save_response(r, directory, max_bytes, check_header, chunk_size)
+
+
+def save_response(r, directory, max_bytes=None, check_header=None, chunk_size=CHUNK_SIZE):
+    """Write the body of a streamed 200 response to a temp file in `directory`
+    and return its path, applying the same size and header checks as
+    download_to_temp()."""
+    length = r.headers.get("Content-Length")
+    if max_bytes and length and length.isdigit() and int(length) > max_bytes:
+        raise DownloadError(f"file too large ({length} bytes)")
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".part")
+    try:
+        size = 0
+        with os.fdopen(fd, "wb") as f:
+            for chunk in r.iter_content(chunk_size):
+                if not chunk:
+                    continue
+                if size == 0 and check_header and not check_header(chunk):
+                    raise DownloadError("content is not of the expected type")
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise DownloadError(f"file larger than {max_bytes} bytes")
+                f.write(chunk)
+        if size == 0:
+            raise DownloadError("empty response")
+        count("http_bytes", size)
+        return tmp_path
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def close():
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -0,0 +1,141 @@
+import os
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from .tracing import span
+
+# Cap on a single downloaded image
+MAX_IMAGE_BYTES = 32 * 1024 * 1024
+
+# Content types accepted for art downloads (octet-stream covers some CDNs)
+IMAGE_CONTENT_TYPES = ("image/", "application/octet-stream", "binary/octet-stream")
+
+IMAGE_SIGNATURES = (
+    b"\x89PNG\r\n\x1a\n",
+    b"\xff\xd8\xff",
+    b"GIF87a",
+    b"GIF89a",
+    b"BM",
+)
+
+# Largest size each file is scaled down to (aspect ratio is kept, never upscaled)
+DEFAULT_ART_SIZES = {
+    "ICON0": (320, 176),
+    "PIC1": (640, 448),
+}
+
+# Full-screen backgrounds: transparency is flattened onto black, which is what
+# the XMB shows behind them anyway. Logos (ICON0) keep their alpha channel
+OPAQUE_KINDS = ("PIC1",)
+
+
+def parse_size(text):
+    """Parse "WIDTHxHEIGHT" into a (width, height) tuple."""
+    width, _, height = text.lower().partition("x")
+    return int(width), int(height)
+
+
+def looks_like_image(head):
+    """Check the first bytes of a download against known image signatures."""
+    if head.startswith(IMAGE_SIGNATURES):
+        return True
+    return head[:4] == b"RIFF" and head[8:12] == b"WEBP"
+
+
+def convert_image(source, max_size, quantize=False, opaque=False):
+    """Decode any image Pillow understands (path or file object) and re-encode it as a real PNG.
+
+    Runs in a worker process. Transparent images keep their alpha channel
+    unless `opaque` is set (backgrounds, see OPAQUE_KINDS), in which case
+    they are flattened onto black as RGB. With `quantize` the result is
+    reduced to a 256-colour palette, which makes much smaller files for the
+    PS2 to load.
+    """
+    from PIL import Image
+
+    with Image.open(source) as img:
+        img.load()
+        has_alpha = img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+        img = img.convert("RGBA" if has_alpha else "RGB")
+        if has_alpha and opaque:
+            background = Image.new("RGB", img.size, (0, 0, 0))
+            background.paste(img, mask=img.getchannel("A"))
+            img, has_alpha = background, False
+        if max_size:
+            img.thumbnail(max_size, Image.LANCZOS)
+        if quantize:
+            method = Image.FASTOCTREE if has_alpha else Image.MEDIANCUT
+            img = img.quantize(colors=256, method=method)
+        out = io.BytesIO()
+        img.save(out, format="PNG", optimize=True)
+        return out.getvalue()
+
+
+def convert_file(src, dest, max_size, quantize=False, opaque=False):
+    """Worker-process wrapper: convert `src` and atomically write the PNG to `dest`."""
+    png = convert_image(src, max_size, quantize, opaque)
+    tmp_path = f"{dest}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(png)
+    os.replace(tmp_path, dest)
+    return len(png)
+
+
+class ImageProcessor:
+    """Converts downloaded art on a process pool so encoding doesn't hold the GIL.
+
+    `save()` is called from the download threads and blocks only the
+    calling thread while a worker process encodes the image.
+    """
+
+    def __init__(self, sizes=None, quantize=False, workers=None, enabled=True, log=print):
+        self.sizes = dict(DEFAULT_ART_SIZES, **(sizes or {}))
+        self.quantize = quantize
+        self.enabled = enabled
+        self.log = log
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = None
+        if enabled:
+            try:
+                import PIL  # noqa: F401
+            except ImportError:
+                self.log("[WARN] Pillow is not installed, images will be saved as downloaded")
+                self.enabled = False
+
+    def _get_pool(self):
+        if self.pool is None:
+            # spawn avoids forking a process that has network/log threads running
+            self.pool = ProcessPoolExecutor(max_workers=self.workers,
+                                            mp_context=multiprocessing.get_context("spawn"))
+        return self.pool
+
+    def save(self, src, dest, kind):
+        """Move a downloaded file into place as ICON0/PIC1, converting it first.
+
+        `src` is consumed: it's either renamed to `dest` (conversion
+        disabled) or converted into `dest` and removed.
+        """
+        if not self.enabled:
+            os.replace(src, dest)
+            return
+        try:
+            with span("convert_image"):
+                self._get_pool().submit(convert_file, str(src), str(dest), self.sizes.get(kind), self.quantize,
+                                        kind in OPAQUE_KINDS).result()
+        finally:
+            if os.path.exists(src):
+                os.remove(src)
+
+    def variant(self, kind):
+        """Key for the output settings of `kind`, so stored results are only
+        reused when they were produced the same way."""
+        if not self.enabled:
+            return "raw"
+        width, height = self.sizes.get(kind) or (0, 0)
+        variant = f"{kind}:{width}x{height}:{'q' if self.quantize else 'rgb'}"
+        return variant + ":opaque" if kind in OPAQUE_KINDS else variant
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
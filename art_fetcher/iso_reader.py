@@ -0,0 +1,154 @@
+import os
+import re
+import struct
+from .compressed_images import open_compressed
+
+SECTOR_SIZE = 2048
+RAW_SECTOR_SIZE = 2352
+CD_FRAME_SIZE = 2448
+PVD_SECTOR = 16
+SYSTEM_CNF = "SYSTEM.CNF"
+IMAGE_EXTENSIONS = (".iso", ".cso", ".zso", ".chd")
+
+# Matches "BOOT2 = cdrom0:\SLUS_203.12;1" and returns "SLUS_203.12"
+BOOT2_PATTERN = re.compile(r"BOOT2\s*=\s*cdrom0:\\?([^;\s]+)", re.IGNORECASE)
+
+
+class IsoFormatError(Exception):
+    pass
+
+
+class FileReader:
+    """Positioned reads from an uncompressed image file."""
+
+    def __init__(self, path):
+        self.fd = os.open(str(path), os.O_RDONLY | getattr(os, "O_BINARY", 0))
+
+    def read(self, offset, size):
+        if hasattr(os, "pread"):
+            return os.pread(self.fd, size, offset)
+        os.lseek(self.fd, offset, os.SEEK_SET)
+        return os.read(self.fd, size)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SectorView:
+    """Logical 2048-byte sectors on top of a reader.
+
+    Handles cooked .iso dumps, raw 2352-byte sector images (mode 1 and
+    mode 2 form 1) and CHD CD frames with subcode, detected from where the
+    "CD001" signature lives.
+    """
+
+    LAYOUTS = ((SECTOR_SIZE, 0), (RAW_SECTOR_SIZE, 16), (RAW_SECTOR_SIZE, 24),
+               (CD_FRAME_SIZE, 16), (CD_FRAME_SIZE, 24))
+
+    def __init__(self, reader):
+        self.reader = reader
+        for sector_size, header in self.LAYOUTS:
+            descriptor = reader.read(PVD_SECTOR * sector_size + header, SECTOR_SIZE)
+            if len(descriptor) == SECTOR_SIZE and descriptor[1:6] == b"CD001":
+                self.sector_size, self.header = sector_size, header
+                return
+        raise IsoFormatError("No ISO9660 volume descriptor found")
+
+    def read_sectors(self, lba, count):
+        if self.sector_size == SECTOR_SIZE:
+            return self.reader.read(lba * SECTOR_SIZE, count * SECTOR_SIZE)
+        return b"".join(self.reader.read((lba + i) * self.sector_size + self.header, SECTOR_SIZE)
+                        for i in range(count))
+
+    def read_extent(self, lba, size):
+        count = (size + SECTOR_SIZE - 1) // SECTOR_SIZE
+        return self.read_sectors(lba, count)[:size]
+
+
+def _primary_root_record(view):
+    # Walk the volume descriptor set up to the terminator looking for the PVD
+    lba = PVD_SECTOR
+    while True:
+        descriptor = view.read_sectors(lba, 1)
+        if len(descriptor) < SECTOR_SIZE or descriptor[1:6] != b"CD001":
+            raise IsoFormatError("Primary volume descriptor not found")
+        if descriptor[0] == 1:
+            return descriptor[156:156 + 34]
+        if descriptor[0] == 255:
+            raise IsoFormatError("Primary volume descriptor not found")
+        lba += 1
+
+
+def iter_directory(data):
+    """Yield (name, extent_lba, size, flags) for each record in a directory extent."""
+    pos = 0
+    while pos < len(data):
+        length = data[pos]
+        if length == 0:
+            # Records never cross sector boundaries; skip the padding
+            pos = (pos // SECTOR_SIZE + 1) * SECTOR_SIZE
+            continue
+        record = data[pos:pos + length]
+        if len(record) < 34:
+            break
+        extent, = struct.unpack_from("<I", record, 2)
+        size, = struct.unpack_from("<I", record, 10)
+        flags = record[25]
+        name_length = record[32]
+        name = record[33:33 + name_length].decode("ascii", errors="ignore")
+        yield name, extent, size, flags
+        pos += length
+
+
+def find_root_file(view, filename):
+    root = _primary_root_record(view)
+    root_lba, = struct.unpack_from("<I", root, 2)
+    root_size, = struct.unpack_from("<I", root, 10)
+    for name, extent, size, flags in iter_directory(view.read_extent(root_lba, root_size)):
+        if not flags & 0x02 and name.split(";")[0].upper() == filename:
+            return view.read_extent(extent, size)
+    return None
+
+
+def parse_boot2(text):
+    match = BOOT2_PATTERN.search(text)
+    return match.group(1) if match else None
+
+
+def read_system_cnf(reader):
+    """Return the SYSTEM.CNF text from an image, or None if it has none."""
+    data = find_root_file(SectorView(reader), SYSTEM_CNF)
+    if data is None:
+        return None
+    return data.decode("utf-8", errors="ignore")
+
+
+def open_image(path):
+    """Reader for an ISO or a compressed CSO/ZSO/CHD image, chosen by magic bytes."""
+    return open_compressed(path) or FileReader(path)
+
+
+def read_gameid(path):
+    """Fast path: read BOOT2 from SYSTEM.CNF with a handful of sector reads.
+
+    Works on compressed images too, decompressing only the blocks holding
+    the volume descriptors, root directory and SYSTEM.CNF. Raises
+    IsoFormatError (or OSError) when the image can't be read this way, so
+    callers can fall back to a full ISO parser.
+    """
+    with open_image(path) as reader:
+        text = read_system_cnf(reader)
+    if text is None:
+        raise IsoFormatError("SYSTEM.CNF not found in root directory")
+    gameid = parse_boot2(text)
+    if gameid is None:
+        raise IsoFormatError("BOOT2 entry not found in SYSTEM.CNF")
+    return gameid
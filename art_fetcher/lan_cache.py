@@ -0,0 +1,271 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from . import http_client
+from .images import MAX_IMAGE_BYTES
+
+LAN_CACHE_DIR = "art_cache"
+# Loopback only by default; serving the LAN is an explicit choice ("--serve-cache 0.0.0.0:8765")
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Upstream hosts the server will fetch for, with how long (seconds) a
+# stored answer is served before it is revalidated. None never expires:
+# image URLs are content-addressed upstream and never change.
+CACHE_POLICIES = {
+    "images.launchbox-app.com": None,
+    "cdn2.steamgriddb.com": None,
+    "gamesdb.launchbox-app.com": 3600,
+    "raw.githubusercontent.com": 3600,
+    "www.steamgriddb.com": 7 * 24 * 3600,
+}
+
+# Largest body stored per host; anything bigger is refused instead of filling the disk.
+# Image hosts get the same cap as direct art downloads, Metadata.zip is far larger
+SIZE_LIMITS = {
+    "gamesdb.launchbox-app.com": 512 * 1024 * 1024,
+    "raw.githubusercontent.com": 64 * 1024 * 1024,
+    "www.steamgriddb.com": 4 * 1024 * 1024,
+}
+
+# Hosts whose answers depend on the caller's API key: those are cached per
+# Authorization value, so one user's key can't be used by every LAN client
+PER_KEY_HOSTS = ("www.steamgriddb.com",)
+
+# Request headers passed on to the upstream
+FORWARD_HEADERS = ("Authorization",)
+
+
+class ForbiddenUrl(Exception):
+    pass
+
+
+class UpstreamStatus(Exception):
+    """Upstream answered with something other than 200/304; passed through uncached."""
+
+    def __init__(self, status, retry_after=None):
+        super().__init__(f"upstream status {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class ArtCache:
+    """On-disk cache of upstream responses, keyed by URL (and by a hash of the
+    Authorization header for PER_KEY_HOSTS).
+
+    Each entry is a body file plus a small JSON sidecar (content type,
+    ETag/Last-Modified, fetch time). Concurrent requests for the same URL
+    wait for a single upstream fetch. Expired entries are revalidated with
+    a conditional request, so an unchanged Metadata.zip is not downloaded
+    again.
+    """
+
+    def __init__(self, directory=LAN_CACHE_DIR, policies=None, log=print):
+        self.directory = directory
+        self.policies = dict(CACHE_POLICIES if policies is None else policies)
+        self.log = log
+        self.locks = defaultdict(threading.Lock)
+        self.locks_lock = threading.Lock()
+        self.stats = {"hit": 0, "miss": 0, "revalidated": 0}
+        self.stats_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _key(self, url, host, headers):
+        if host not in PER_KEY_HOSTS:
+            return url
+        authorization = headers.get("Authorization", "")
+        return url + "\n" + hashlib.sha256(authorization.encode("utf-8")).hexdigest()
+
+    def _paths(self, key):
+        key = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        folder = os.path.join(self.directory, key[:2])
+        return folder, os.path.join(folder, key), os.path.join(folder, key + ".json")
+
+    def _lock(self, key):
+        with self.locks_lock:
+            return self.locks[key]
+
+    def _load_meta(self, meta_path, body_path):
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return None
+        return meta if os.path.exists(body_path) else None
+
+    def _save_meta(self, meta_path, meta):
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def _count(self, outcome):
+        with self.stats_lock:
+            self.stats[outcome.lower()] += 1
+
+    def fetch(self, url, headers=None):
+        """Return (meta, body_path, outcome) for an upstream URL, fetching or
+        revalidating it first when needed. outcome is HIT, MISS or REVALIDATED."""
+        parts = urlsplit(url or "")
+        host = parts.netloc.lower()
+        if parts.scheme not in ("http", "https") or host not in self.policies:
+            raise ForbiddenUrl(f"host not allowed: {host or url}")
+        max_age = self.policies[host]
+        headers = dict(headers or {})
+        key = self._key(url, host, headers)
+        folder, body_path, meta_path = self._paths(key)
+
+        with self._lock(key):
+            meta = self._load_meta(meta_path, body_path)
+            if meta is not None and (max_age is None or time.time() - meta["fetched"] < max_age):
+                self._count("HIT")
+                return meta, body_path, "HIT"
+
+            request_headers = dict(headers)
+            if meta is not None:
+                if meta.get("etag"):
+                    request_headers["If-None-Match"] = meta["etag"]
+                if meta.get("last_modified"):
+                    request_headers["If-Modified-Since"] = meta["last_modified"]
+            with http_client.get(url, headers=request_headers, stream=True, use_cache_server=False) as r:
+                if r.status_code == 304 and meta is not None:
+                    meta["fetched"] = time.time()
+                    self._save_meta(meta_path, meta)
+                    self._count("REVALIDATED")
+                    return meta, body_path, "REVALIDATED"
+                if r.status_code != 200:
+                    raise UpstreamStatus(r.status_code, r.headers.get("Retry-After"))
+                os.makedirs(folder, exist_ok=True)
+                tmp_path = http_client.save_response(r, folder, max_bytes=SIZE_LIMITS.get(host, MAX_IMAGE_BYTES))
+                os.replace(tmp_path, body_path)
+                meta = {
+                    "url": url,
+                    "content_type": r.headers.get("Content-Type", "application/octet-stream"),
+                    "etag": r.headers.get("ETag"),
+                    "last_modified": r.headers.get("Last-Modified"),
+                    "fetched": time.time(),
+                }
+                self._save_meta(meta_path, meta)
+            self._count("MISS")
+            self.log(f"[DEBUG] Cached {url}")
+            return meta, body_path, "MISS"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "PS2ArtCache"
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path == "/stats":
+            return self._send_json(200, self.server.cache.stats)
+        if parts.path != "/fetch":
+            return self._send_json(404, {"error": "not found"})
+        url = parse_qs(parts.query).get("url", [None])[0]
+        headers = {name: self.headers[name] for name in FORWARD_HEADERS if self.headers.get(name)}
+        try:
+            meta, body_path, outcome = self.server.cache.fetch(url, headers)
+        except ForbiddenUrl as e:
+            return self._send_json(403, {"error": str(e)})
+        except UpstreamStatus as e:
+            extra = {"Retry-After": e.retry_after} if e.retry_after else {}
+            return self._send_json(e.status, {"error": str(e)}, extra)
+        except Exception as e:
+            self.server.cache.log(f"[ERROR] LAN art cache failed to fetch {url}: {e}")
+            return self._send_json(502, {"error": str(e)})
+
+        # Let clients' own conditional requests (GameIndex, Metadata.zip) end in a 304
+        if ((meta.get("etag") and self.headers.get("If-None-Match") == meta["etag"]) or
+                (meta.get("last_modified") and self.headers.get("If-Modified-Since") == meta["last_modified"])):
+            self.send_response(304)
+            self._send_validators(meta, outcome)
+            self.end_headers()
+            return
+
+        with open(body_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self.send_response(200)
+            self.send_header("Content-Type", meta["content_type"])
+            self.send_header("Content-Length", str(size))
+            self._send_validators(meta, outcome)
+            self.end_headers()
+            while True:
+                chunk = f.read(http_client.CHUNK_SIZE)
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+
+    def _send_validators(self, meta, outcome):
+        if meta.get("etag"):
+            self.send_header("ETag", meta["etag"])
+        if meta.get("last_modified"):
+            self.send_header("Last-Modified", meta["last_modified"])
+        self.send_header("X-Cache", outcome)
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        self.server.cache.log(f"[DEBUG] {self.client_address[0]} {format % args}")
+
+
+class ArtCacheServer:
+    """Caching HTTP proxy for Metadata.zip, GameIndex.yaml, SteamGridDB API
+    responses and art images, shared by every installation on the LAN.
+
+    Clients request GET /fetch?url=<upstream url> (see
+    http_client.set_cache_server); GET /stats reports hit/miss counts.
+    Only hosts listed in `policies` are fetched, so the server can't be
+    used as an open proxy.
+    """
+
+    def __init__(self, directory=LAN_CACHE_DIR, host=DEFAULT_HOST, port=DEFAULT_PORT, policies=None, log=print):
+        self.cache = ArtCache(directory, policies, log)
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.cache = self.cache
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        if host in ("0.0.0.0", "::"):
+            host = "127.0.0.1"
+        return f"http://{host}:{port}"
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def start(self):
+        """Serve from a background thread (used by tests and embedding)."""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="lan-art-cache", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+
+def parse_address(text, default_host=DEFAULT_HOST, default_port=DEFAULT_PORT):
+    """Parse "[HOST:]PORT" (or just HOST) into a (host, port) tuple."""
+    host, _, port = text.rpartition(":")
+    if not host:
+        if port.isdigit():
+            return default_host, int(port)
+        return port or default_host, default_port
+    return host, int(port) if port else default_port
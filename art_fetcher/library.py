@@ -0,0 +1,119 @@
+import os
+from pathlib import Path
+from fnmatch import fnmatchcase
+from collections import namedtuple
+from .iso_reader import IMAGE_EXTENSIONS
+
+# Folders OPL and OSD-XMB read disc images from
+LIBRARY_FOLDERS = ("DVD", "CD")
+
+# path: full Path; name: path inside the library with "/" separators, which is
+# what the scan cache and exclusion list are keyed by. Images under DVD are
+# named relative to DVD (a top-level image is just its filename, as before),
+# the other folders keep their folder as a prefix ("CD/Game.iso") so the same
+# filename in DVD and CD can't collide; stat: os.stat_result from the scan
+LibraryFile = namedtuple("LibraryFile", "path name stat")
+
+
+def _matches(patterns, name):
+    """True if a case-insensitive glob matches the relative name or its last component."""
+    name = name.lower()
+    base = name.rsplit("/", 1)[-1]
+    return any(fnmatchcase(name, pattern) or fnmatchcase(base, pattern) for pattern in patterns)
+
+
+class Library:
+    """Disc images under a root's DVD and CD folders, including subfolders.
+
+    scan() walks the folders with os.scandir and yields images as they are
+    found, so the pipeline can start on the first games while the rest of
+    the tree is still being listed. Extensions match case-insensitively.
+    `include` and `exclude` are glob patterns tried against the library name
+    (see LibraryFile) and against the bare name; an excluded folder, CD
+    included, isn't entered at all. Hidden files and folders (including macOS
+    "._" files on exFAT drives) and symlinked folders are skipped.
+    """
+
+    def __init__(self, root, folders=LIBRARY_FOLDERS, extensions=IMAGE_EXTENSIONS,
+                 include=(), exclude=(), log=print):
+        self.directories = [os.path.join(str(root), folder) for folder in folders]
+        # Name prefix per folder: none for the first (DVD), "<folder>/" for the rest
+        self.prefixes = ["" if index == 0 else folder + "/" for index, folder in enumerate(folders)]
+        self.extensions = tuple(extension.lower() for extension in extensions)
+        self.include = [pattern.lower() for pattern in include]
+        self.exclude = [pattern.lower() for pattern in exclude]
+        self.log = log
+
+    def wanted(self, name):
+        """Whether a relative image name passes the extension and pattern filters."""
+        if not name.lower().endswith(self.extensions):
+            return False
+        if self.include and not _matches(self.include, name):
+            return False
+        return not _matches(self.exclude, name)
+
+    def relative_name(self, path):
+        """Library name of a path under DVD/CD, or None if it is outside them or hidden."""
+        path = os.path.abspath(str(path))
+        for directory, prefix in zip(self.directories, self.prefixes):
+            directory = os.path.abspath(directory)
+            if path.startswith(directory + os.sep):
+                relative = os.path.relpath(path, directory).replace(os.sep, "/")
+                if not any(part.startswith(".") for part in relative.split("/")):
+                    return prefix + relative
+        return None
+
+    def path_for(self, name):
+        """Full path of a library name, the inverse of relative_name()."""
+        for directory, prefix in zip(self.directories, self.prefixes):
+            if prefix and name.startswith(prefix):
+                return os.path.join(directory, *name[len(prefix):].split("/"))
+        return os.path.join(self.directories[0], *name.split("/"))
+
+    def name_for(self, path):
+        """Relative name of a path that scan() would yield, or None."""
+        name = self.relative_name(path)
+        if name is None or not self.wanted(name):
+            return None
+        # Inside an excluded folder, which scan() wouldn't have entered
+        parts = name.split("/")
+        if any(_matches(self.exclude, "/".join(parts[:depth])) for depth in range(1, len(parts))):
+            return None
+        return name
+
+    def entry(self, path, stat=None):
+        """LibraryFile for a path that scan() would yield, else None. Raises OSError if it is gone."""
+        name = self.name_for(path)
+        if name is None:
+            return None
+        return LibraryFile(Path(path), name, stat or os.stat(path))
+
+    def scan(self):
+        """Yield a LibraryFile for every wanted image, folder by folder."""
+        for directory, prefix in zip(self.directories, self.prefixes):
+            if not os.path.isdir(directory) or (prefix and _matches(self.exclude, prefix.rstrip("/"))):
+                continue
+            pending = [(directory, prefix)]
+            while pending:
+                folder, prefix = pending.pop()
+                try:
+                    with os.scandir(folder) as entries:
+                        listing = sorted(entries, key=lambda entry: entry.name.lower())
+                except OSError as e:
+                    self.log(f"[WARN] Could not list {folder}: {e}")
+                    continue
+                subfolders = []
+                for entry in listing:
+                    if entry.name.startswith("."):
+                        continue
+                    name = prefix + entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not _matches(self.exclude, name):
+                                subfolders.append((entry.path, name + "/"))
+                        elif self.wanted(name) and entry.is_file():
+                            yield LibraryFile(Path(entry.path), name, entry.stat())
+                    except OSError as e:
+                        self.log(f"[WARN] Could not read {entry.path}: {e}")
+                # Depth-first, in name order
+                pending.extend(reversed(subfolders))
@@ -0,0 +1,94 @@
+import os
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+
+LOG_FILE = "log.txt"
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
+
+logger = logging.getLogger("art_fetcher")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+
+_listener = None
+
+# Existing messages carry their severity as a prefix
+_PREFIX_LEVELS = (
+    ("[ERROR]", logging.ERROR),
+    ("[WARN]", logging.WARNING),
+    ("[INFO]", logging.INFO),
+    ("[DEBUG]", logging.DEBUG),
+)
+
+
+def level_for(message):
+    for prefix, level in _PREFIX_LEVELS:
+        if message.startswith(prefix):
+            return level
+    return logging.INFO
+
+
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps({
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }, ensure_ascii=False)
+
+
+def setup_logging(log_file=LOG_FILE, level="INFO", json_lines=False,
+                  max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT, new_run=True):
+    """Route log records through a queue to a background writer thread.
+
+    The file handler rotates by size, and `new_run` rolls the previous run's
+    log over to log.txt.1 so each run starts with a fresh file. The writer
+    is flushed and stopped at interpreter exit.
+    """
+    global _listener
+    shutdown_logging()
+
+    handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count,
+                                                   encoding="utf-8", delay=True)
+    if json_lines:
+        handler.setFormatter(JsonLinesFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(message)s", "%Y-%m-%d %H:%M:%S"))
+    if new_run and os.path.exists(log_file) and os.path.getsize(log_file) > 0:
+        handler.doRollover()
+
+    log_queue = queue.SimpleQueue()
+    for existing in list(logger.handlers):
+        logger.removeHandler(existing)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+
+    _listener = logging.handlers.QueueListener(log_queue, handler)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """Flush pending records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+def write_log(message):
+    """Queue a message for the log file; returns False if its level is filtered out."""
+    level = level_for(message)
+    if not logger.isEnabledFor(level):
+        return False
+    logger.log(level, message)
+    return True
@@ -0,0 +1,341 @@
+import os
+import json
+import time
+import sqlite3
+import zipfile
+import threading
+from . import http_client
+from .fuzzy import TitleMatcher
+from .tracing import traced
+
+METADATA_URL = "https://gamesdb.launchbox-app.com/Metadata.zip"
+METADATA_ZIP = "Metadata.zip"
+METADATA_XML = "Metadata.xml"
+METADATA_DB = "metadata.db"
+METADATA_STATE_FILE = "metadata.json"
+PS2_PLATFORM = "sony playstation 2"
+IMAGE_BASE_URL = "https://images.launchbox-app.com//"
+
+# Metadata.zip is not checked upstream again until it is this old
+DEFAULT_MAX_AGE_HOURS = 24
+
+# Bump when the table layout changes so old databases get rebuilt
+SCHEMA_VERSION = "1"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS games (
+    database_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    name_lower TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_name_lower ON games (name_lower);
+CREATE TABLE IF NOT EXISTS images (
+    database_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    file_name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS images_database_id ON images (database_id, type);
+"""
+
+
+def _child_text(elem, tag):
+    child = elem.find(tag)
+    if child is not None and child.text is not None:
+        return child.text.strip()
+    return None
+
+
+# Signature of the source file, used to detect when the index is stale
+def source_signature(path):
+    st = os.stat(path)
+    return f"{SCHEMA_VERSION}:{st.st_size}:{int(st.st_mtime)}"
+
+
+def is_zip(head):
+    return head.startswith(b"PK\x03\x04")
+
+
+def find_metadata_member(zip_file):
+    """ZipInfo of Metadata.xml inside the LaunchBox archive, or None."""
+    for info in zip_file.infolist():
+        if info.filename.endswith(METADATA_XML):
+            return info
+    return None
+
+
+def iter_metadata_rows(source):
+    """Stream-parse Metadata.xml and yield ("game", id, name) for PS2 games,
+    ("other", id) for games of other platforms and ("image", ...) tuples.
+    Every top-level element is discarded once handled, so memory stays flat
+    no matter how large the dump is."""
+    import xml.etree.ElementTree as ET
+
+    context = ET.iterparse(source, events=("start", "end"))
+    _, root = next(context)
+    depth = 0
+    for event, elem in context:
+        if event == "start":
+            depth += 1
+            continue
+        depth -= 1
+        if depth != 0:
+            continue
+        if elem.tag == "Game":
+            platform = _child_text(elem, "Platform") or ""
+            database_id = _child_text(elem, "DatabaseID")
+            name = _child_text(elem, "Name")
+            if platform.lower() == PS2_PLATFORM and database_id and name:
+                yield "game", database_id, name
+            elif database_id:
+                yield "other", database_id
+        elif elem.tag == "GameImage":
+            database_id = _child_text(elem, "DatabaseID")
+            image_type = _child_text(elem, "Type")
+            file_name = _child_text(elem, "FileName")
+            if database_id and image_type and file_name:
+                yield "image", database_id, image_type, file_name
+        root.clear()
+
+
+@traced("build_metadata_index")
+def build_metadata_index(source, db_path=METADATA_DB, signature=None, log=print):
+    """Build the SQLite index from a Metadata.xml path or file object.
+
+    Only PS2 games and their images are kept. Images of games already seen
+    are kept or dropped straight away; only GameImage rows that show up
+    before their Game are parked in a staging table and filtered at the end.
+    """
+    tmp_path = db_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(SCHEMA)
+        conn.execute("CREATE TEMP TABLE pending_images (database_id TEXT, type TEXT, file_name TEXT)")
+        ps2_ids = set()
+        other_ids = set()  # just the IDs, so images of other platforms aren't staged
+        batch_games, batch_images, batch_pending = [], [], []
+
+        def flush():
+            conn.executemany("INSERT OR REPLACE INTO games VALUES (?, ?, ?)", batch_games)
+            conn.executemany("INSERT INTO images VALUES (?, ?, ?)", batch_images)
+            conn.executemany("INSERT INTO pending_images VALUES (?, ?, ?)", batch_pending)
+            batch_games.clear()
+            batch_images.clear()
+            batch_pending.clear()
+
+        for row in iter_metadata_rows(source):
+            if row[0] == "game":
+                _, database_id, name = row
+                ps2_ids.add(database_id)
+                batch_games.append((database_id, name, name.lower()))
+            elif row[0] == "other":
+                other_ids.add(row[1])
+                continue
+            elif row[1] in ps2_ids:
+                batch_images.append(row[1:])
+            elif row[1] not in other_ids:
+                batch_pending.append(row[1:])
+            if len(batch_games) + len(batch_images) + len(batch_pending) >= 5000:
+                flush()
+        flush()
+
+        conn.execute("INSERT INTO images SELECT database_id, type, file_name FROM pending_images "
+                     "WHERE database_id IN (SELECT database_id FROM games)")
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('signature', ?)", (signature or "",))
+        conn.commit()
+        game_count = conn.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+        image_count = conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+    except Exception:
+        conn.close()
+        os.remove(tmp_path)
+        raise
+    conn.close()
+    os.replace(tmp_path, db_path)
+    log(f"Built Metadata index: {game_count} PS2 games, {image_count} images.")
+    return True
+
+
+class MetadataIndex:
+    """Indexed read access to the PS2 subset of LaunchBox Metadata.xml.
+
+    The index is built straight from the Metadata.xml member of
+    Metadata.zip, so the (very large) XML is never extracted to disk. The
+    zip is refreshed with a conditional request once it is older than the
+    configured max age; ETag/Last-Modified are kept in METADATA_STATE_FILE.
+    """
+
+    def __init__(self, db_path=METADATA_DB, zip_path=METADATA_ZIP, state_path=METADATA_STATE_FILE, log=print):
+        self.db_path = db_path
+        self.zip_path = zip_path
+        self.state_path = state_path
+        self.log = log
+        self.conn = None
+        self.matcher = None
+        self.lock = threading.Lock()
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            return state if isinstance(state, dict) else {}
+        except (json.JSONDecodeError, OSError):
+            return {}
+
+    def _save_state(self, state):
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def refresh(self, url=METADATA_URL, max_age_hours=DEFAULT_MAX_AGE_HOURS):
+        """Bring Metadata.zip up to date.
+
+        Does nothing while the last check is younger than `max_age_hours`
+        (0 checks every time). Otherwise sends a conditional GET and, when
+        upstream changed, streams the new archive to a temp file that
+        replaces Metadata.zip once it has been verified. Returns False only
+        when no usable Metadata.zip is available.
+        """
+        state = self._load_state()
+        have_zip = os.path.exists(self.zip_path)
+        if have_zip and max_age_hours and time.time() - state.get("checked", 0) < max_age_hours * 3600:
+            self.log(f"Metadata.zip checked less than {max_age_hours:g} hours ago, skipping refresh.")
+            return True
+
+        headers = {}
+        if have_zip:
+            if state.get("etag"):
+                headers["If-None-Match"] = state["etag"]
+            if state.get("last_modified"):
+                headers["If-Modified-Since"] = state["last_modified"]
+        try:
+            with http_client.get(url, headers=headers, stream=True) as r:
+                if r.status_code == 304:
+                    self.log("Metadata.zip unchanged, using local copy.")
+                elif r.status_code != 200:
+                    self.log(f"[ERROR] Failed to download Metadata.zip (status {r.status_code})")
+                    return have_zip
+                else:
+                    self.log("Downloading Metadata.zip...")
+                    directory = os.path.dirname(os.path.abspath(self.zip_path))
+                    tmp_path = http_client.save_response(r, directory, check_header=is_zip)
+                    try:
+                        with zipfile.ZipFile(tmp_path) as zip_file:
+                            if find_metadata_member(zip_file) is None:
+                                raise http_client.DownloadError("Metadata.xml not found in the downloaded zip file")
+                    except (zipfile.BadZipFile, http_client.DownloadError):
+                        os.remove(tmp_path)
+                        raise
+                    os.replace(tmp_path, self.zip_path)
+                    state = {"etag": r.headers.get("ETag"), "last_modified": r.headers.get("Last-Modified")}
+                    self.log("Saved Metadata.zip.")
+            state["checked"] = time.time()
+            self._save_state(state)
+            self._remove_extracted_xml()
+            return True
+        except Exception as e:
+            self.log(f"[ERROR] Failed to download Metadata.zip: {e}")
+            return have_zip
+
+    def _remove_extracted_xml(self, xml_path=METADATA_XML):
+        # Older versions extracted Metadata.xml next to the script; the zip replaces it
+        if os.path.exists(self.zip_path) and os.path.exists(xml_path):
+            try:
+                os.remove(xml_path)
+                self.log("Removed Metadata.xml extracted by an older version, the index now reads Metadata.zip.")
+            except OSError:
+                pass
+
+    def ensure_built(self, xml_path=METADATA_XML):
+        """Open the index, rebuilding it first if Metadata.zip (or a
+        standalone Metadata.xml) changed."""
+        if os.path.exists(self.zip_path):
+            source = self.zip_path
+        elif os.path.exists(xml_path):
+            source = xml_path
+        elif os.path.exists(self.db_path):
+            return self.open()
+        else:
+            return False
+        signature = source_signature(source)
+        if self.stored_signature() != signature:
+            self.close()
+            self.log(f"Building Metadata index from {os.path.basename(source)}...")
+            if source == self.zip_path:
+                with zipfile.ZipFile(source) as zip_file:
+                    member = find_metadata_member(zip_file)
+                    if member is None:
+                        raise ValueError("Metadata.xml not found in Metadata.zip")
+                    with zip_file.open(member) as stream:
+                        build_metadata_index(stream, self.db_path, signature, self.log)
+            else:
+                build_metadata_index(source, self.db_path, signature, self.log)
+        return self.open()
+
+    def stored_signature(self):
+        if not os.path.exists(self.db_path):
+            return None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                row = conn.execute("SELECT value FROM meta WHERE key = 'signature'").fetchone()
+            finally:
+                conn.close()
+            return row[0] if row else None
+        except sqlite3.Error:
+            return None
+
+    def open(self):
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        return True
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+        self.matcher = None
+
+    def _query(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def find_game(self, game_name, threshold=0.7):
+        """Return (database_id, matched_name, similarity) or None."""
+        if self.conn is None:
+            return None
+        rows = self._query("SELECT database_id, name FROM games WHERE name_lower = ?", (game_name.lower(),))
+        if rows:
+            return rows[0][0], rows[0][1], 1.0
+
+        return self.title_matcher().best_match(game_name, threshold)
+
+    def title_matcher(self):
+        """Trigram matcher over all indexed titles, built on first use."""
+        with self.lock:
+            if self.matcher is None:
+                rows = self.conn.execute("SELECT database_id, name FROM games ORDER BY rowid").fetchall()
+                self.matcher = TitleMatcher(rows)
+            return self.matcher
+
+    def find_images(self, database_id):
+        """Return (logo_url, hero_url) for a DatabaseID.
+
+        Picks the first Clear Logo, the first Fanart - Background, and falls
+        back to the first screenshot for the hero.
+        """
+        if self.conn is None:
+            return None, None
+        rows = self._query("SELECT type, file_name FROM images WHERE database_id = ? ORDER BY rowid",
+                           (database_id,))
+        logo_url, hero_url, screenshot_url = None, None, None
+        for image_type, file_name in rows:
+            if image_type == "Clear Logo" and not logo_url:
+                logo_url = IMAGE_BASE_URL + file_name
+            elif image_type == "Fanart - Background" and not hero_url:
+                hero_url = IMAGE_BASE_URL + file_name
+            elif "Screenshot" in image_type and not screenshot_url:
+                screenshot_url = IMAGE_BASE_URL + file_name
+        return logo_url, hero_url or screenshot_url
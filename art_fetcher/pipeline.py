@@ -0,0 +1,128 @@
+import queue
+import threading
+from collections import defaultdict
+from .tracing import span
+
+DEFAULT_JOBS = 4
+
+_DONE = object()
+
+
+class Stage:
+    """One step of the scan pipeline: `func(job)` run by `workers` threads.
+
+    A stage receives a job dict, fills in its own fields and returns it.
+    Jobs that already carry a final "status" skip the remaining stages.
+    """
+
+    def __init__(self, name, func, workers=1):
+        self.name = name
+        self.func = func
+        self.workers = max(1, int(workers))
+
+
+class SharedResults:
+    """Compute a value once per key, even when several workers ask for the
+    same key at the same time: later callers wait and reuse the result.
+    Exceptions are not stored, so a failed key is tried again."""
+
+    def __init__(self):
+        self.results = {}
+        self.locks = defaultdict(threading.Lock)
+        self.lock = threading.Lock()
+
+    def get(self, key, func):
+        """Return (value, reused)."""
+        with self.lock:
+            key_lock = self.locks[key]
+        with key_lock:
+            if key in self.results:
+                return self.results[key], True
+            value = func()
+            self.results[key] = value
+            return value, False
+
+    def forget(self, predicate):
+        """Drop the stored results for which predicate(value) is true, so they are computed again."""
+        with self.lock:
+            for key in [key for key, value in self.results.items() if predicate(value)]:
+                del self.results[key]
+
+    def __len__(self):
+        return len(self.results)
+
+
+def run_pipeline(jobs, stages, queue_size=16, stop_event=None, log=print):
+    """Push `jobs` through `stages` and yield each job as it finishes.
+
+    Stages are connected by bounded queues so a slow stage applies back
+    pressure instead of buffering the whole library. Finished jobs are
+    yielded on the calling thread, which keeps cache updates and summary
+    bookkeeping single-threaded. If iterating `jobs` raises, the jobs fed
+    so far still finish and the exception is re-raised here afterwards.
+    """
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+    threads = []
+    feed_errors = []
+
+    def feed():
+        # `jobs` may be a generator doing I/O (library scan, cache lookups);
+        # whatever it raises, the stages must still be told to shut down
+        try:
+            for job in jobs:
+                if stop_event is not None and stop_event.is_set():
+                    break
+                queues[0].put(job)
+        except BaseException as e:
+            feed_errors.append(e)
+        finally:
+            for _ in range(stages[0].workers):
+                queues[0].put(_DONE)
+
+    def work(index, stage, remaining):
+        inbox, outbox = queues[index], queues[index + 1]
+        while True:
+            job = inbox.get()
+            if job is _DONE:
+                break
+            if job.get("status") is None:
+                if stop_event is not None and stop_event.is_set():
+                    job["status"], job["reason"] = "STOPPED", "Scan stopped"
+                else:
+                    try:
+                        # Time per job in each stage, reported as stage_<name> in the scan report
+                        with span(f"stage_{stage.name}"):
+                            stage.func(job)
+                    except Exception as e:
+                        log(f"[ERROR] {stage.name} failed for {job.get('filename')}: {e}")
+                        job["status"], job["reason"] = "BAD", f"{stage.name} failed"
+            outbox.put(job)
+        # The last worker of a stage to finish hands the shutdown to the next stage
+        with remaining["lock"]:
+            remaining["count"] -= 1
+            last = remaining["count"] == 0
+        if last:
+            next_workers = stages[index + 1].workers if index + 1 < len(stages) else 1
+            for _ in range(next_workers):
+                outbox.put(_DONE)
+
+    threads.append(threading.Thread(target=feed, name="pipeline-feed", daemon=True))
+    for index, stage in enumerate(stages):
+        remaining = {"count": stage.workers, "lock": threading.Lock()}
+        for n in range(stage.workers):
+            threads.append(threading.Thread(target=work, args=(index, stage, remaining),
+                                            name=f"pipeline-{stage.name}-{n}", daemon=True))
+    for thread in threads:
+        thread.start()
+
+    results = queues[-1]
+    while True:
+        job = results.get()
+        if job is _DONE:
+            break
+        yield job
+
+    for thread in threads:
+        thread.join()
+    if feed_errors:
+        raise feed_errors[0]
@@ -0,0 +1,230 @@
+import os
+from .fuzzy import normalize_title, strip_disc_suffix
+from .pipeline import SharedResults, Stage, run_pipeline
+
+
+def art_group_key(title, database_id):
+    """Regional releases and every disc of a set share one art lookup: keyed by
+    LaunchBox DatabaseID, or by the GameIndex name without disc markers."""
+    return f"db:{database_id}" if database_id else f"name:{normalize_title(title)}"
+
+
+class Scanner:
+    """The pipeline stages of a library scan, shared by the CLI and the GUI.
+
+    The front ends pass in the functions that do the actual work, each run
+    on a worker thread:
+
+        extract_gameid(iso_path) -> GameID or None
+        lookup_game_name(gameid) -> name or None
+        find_game_in_metadata(title) -> LaunchBox DatabaseID or None
+        fetch_art_urls(title, api_key, database_id) -> (logo_url, hero_url, throttled)
+        download_art(url, art_path, kind)  # raises on failure
+
+    The stages fill in the job dict and set its status, reason and summary
+    line the same way for both front ends.
+    """
+
+    def __init__(self, extract_gameid, lookup_game_name, find_game_in_metadata, fetch_art_urls,
+                 download_art, log=print):
+        self.extract_gameid = extract_gameid
+        self.lookup_game_name = lookup_game_name
+        self.find_game_in_metadata = find_game_in_metadata
+        self.fetch_art_urls = fetch_art_urls
+        self.download_art = download_art
+        self.log = log
+        self.art_groups = SharedResults()
+
+    def stages(self, workers):
+        return [
+            Stage("extract", self.stage_extract_gameid, workers=workers),
+            Stage("lookup", self.stage_lookup_name, workers=1),
+            Stage("resolve", self.stage_resolve_art, workers=workers),
+            Stage("download", self.stage_download_art, workers=workers),
+        ]
+
+    def forget_missing_art(self):
+        """Forget title groups that were rate limited or had no art, so later
+        games of those groups (e.g. in the next watch batch) look them up again."""
+        self.art_groups.forget(lambda art: art[2] or not (art[0] or art[1]))
+
+    # Pipeline stage: read the GameID from the ISO
+    def stage_extract_gameid(self, job):
+        filename = job["filename"]
+        self.log(f"Processing ISO: {filename}")
+        job["gameid"] = self.extract_gameid(job["iso_file"])
+        if not job["gameid"]:
+            self.log(f"Failed to extract GameID from {filename}")
+            job["status"], job["reason"] = "BAD", "Failed to extract GameID"
+            job["summary"] = f"{filename} (Failed to extract GameID)"
+
+    # Pipeline stage: resolve the game name from GameIndex
+    def stage_lookup_name(self, job):
+        job["game_name"] = self.lookup_game_name(job["gameid"])
+        if not job["game_name"]:
+            self.log(f"GameID {job['gameid']} not found in GameIndex for {job['filename']}")
+            job["status"], job["reason"] = "BAD", "GameID not found in GameIndex"
+            job["summary"] = f"{job['filename']} (GameID: {job['gameid']} - Not found in GameIndex)"
+
+    # Pipeline stage: find logo and hero URLs, only for the first game of each title group
+    def stage_resolve_art(self, job):
+        title = strip_disc_suffix(job["game_name"])
+        database_id = self.find_game_in_metadata(title)
+        art, reused = self.art_groups.get(art_group_key(title, database_id),
+                                          lambda: self.fetch_art_urls(title, job["api_key"], database_id))
+        if reused:
+            self.log(f"Reusing art resolved for {title} for {job['gameid']}")
+        job["logo_url"], job["hero_url"], job["throttled"] = art
+
+    # Pipeline stage: download the art into OSDXMB/ART/<GameID>
+    def stage_download_art(self, job):
+        name, original_gameid = job["game_name"], job["gameid"]
+        # Use the original GameID (with dots and underscores) for the folder name
+        art_path = job["root_path"] / "OSDXMB" / "ART" / original_gameid
+        art_path.mkdir(parents=True, exist_ok=True)
+
+        saved = []
+        for kind, url in (("ICON0", job["logo_url"]), ("PIC1", job["hero_url"])):
+            if not url:
+                continue
+            try:
+                self.download_art(url, art_path, kind)
+                self.log(f"Saved {kind}.png for {name} [{original_gameid}]")
+                saved.append(kind)
+            except Exception as e:
+                self.log(f"[ERROR] Failed to save {kind}.png for {name}: {e}")
+
+        if saved:
+            job["status"] = "OK"
+        elif job.get("throttled"):
+            # Not a real miss: keep it apart from BAD so the next run simply tries again
+            job["status"], job["reason"] = "THROTTLED", "SteamGridDB rate limited"
+            job["summary"] = f"{name} (GameID: {original_gameid} - SteamGridDB rate limited, retry later)"
+        else:
+            job["status"], job["reason"] = "BAD", "No art found"
+            job["summary"] = f"{name} (GameID: {original_gameid} - No art found)"
+
+
+class ScanSummary:
+    """Outcome of every image a scan saw, keyed by library name. Cached
+    successes, unreadable files and finished jobs all end up here, so each
+    image is counted once, with its latest outcome. Reported in library
+    order, however the outcomes arrived."""
+
+    def __init__(self):
+        self.games = {}  # name -> (status, summary line)
+        self.order = {}  # name -> position in the library walk
+
+    def place(self, filename):
+        """Position of an image in library order, assigned when it is first seen."""
+        return self.order.setdefault(filename, len(self.order))
+
+    def add(self, filename, status, line):
+        self.place(filename)
+        self.games[filename] = (status, line)
+
+    def remove(self, filename):
+        """Forget an image that is no longer in the library."""
+        self.games.pop(filename, None)
+
+    def add_jobs(self, finished_jobs):
+        """Add finished pipeline jobs."""
+        for job in finished_jobs:
+            if job["status"] == "OK":
+                self.add(job["filename"], "OK", f"{job['game_name']} (GameID: {job['gameid']})")
+            else:
+                self.add(job["filename"], job["status"], job.get("summary") or f"{job['filename']} ({job['reason']})")
+
+    def _in_order(self):
+        return sorted(self.games.items(), key=lambda item: self.order[item[0]])
+
+    @property
+    def successful_games(self):
+        return [line for _, (status, line) in self._in_order() if status == "OK"]
+
+    @property
+    def failed_games(self):
+        return [line for _, (status, line) in self._in_order() if status != "OK"]
+
+    @property
+    def failed_files(self):
+        return [filename for filename, (status, _) in self._in_order() if status != "OK"]
+
+    @property
+    def throttled_files(self):
+        return [filename for filename, (status, _) in self._in_order() if status == "THROTTLED"]
+
+    def __len__(self):
+        return len(self.games)
+
+
+def cache_entry_for_job(job):
+    """Scan-cache entry for a finished pipeline job."""
+    if job["status"] == "OK":
+        return {"status": "OK", "gameid": job["gameid"], "game_name": job["game_name"]}
+    entry = {"status": "THROTTLED" if job["status"] == "THROTTLED" else "BAD", "gameid": job.get("gameid") or "UNKNOWN"}
+    if job.get("game_name"):
+        entry["game_name"] = job["game_name"]
+    entry["reason"] = job.get("reason", "Unknown error")
+    return entry
+
+
+def plan_jobs(cache, library_files, root_path, api_key, summary, log=print, library=None):
+    """Check library images against the scan cache and yield jobs for the ones
+    that need (re)processing.
+
+    A generator, so the pipeline starts on the first games while the library
+    is still being walked. Excluded files are skipped; cached successes and
+    unreadable files go straight into `summary`. With `library`, a cached
+    entry only moves to a new name when the image it was recorded under is
+    gone, so two copies of one image don't keep taking it from each other.
+    Each job's "index" is the image's position in `summary`'s library order.
+    """
+    for library_file in library_files:
+        filename = library_file.name
+        if cache.is_excluded(filename):
+            continue
+
+        # Cached by content, so renamed files are recognised. The stat from the
+        # directory scan is reused, so unchanged files cost no extra I/O
+        try:
+            fingerprint, cache_entry = cache.lookup(library_file.path, library_file.stat, filename)
+        except OSError as e:
+            log(f"[ERROR] Could not read {filename}: {e}")
+            summary.add(filename, "BAD", f"{filename} (Could not read file)")
+            continue
+        if cache_entry is not None:
+            previous = cache_entry.get("filename")
+            if previous != filename and not (previous and library and os.path.exists(library.path_for(previous))):
+                log(f"Recognised {filename} as previously scanned {previous}")
+                cache.record(fingerprint, filename, cache_entry)
+
+            if cache_entry["status"] == "OK":
+                log(f"Skipping {filename} - already processed successfully")
+                summary.add(filename, "OK", f"{cache_entry.get('game_name', 'Unknown')} (GameID: {cache_entry['gameid']})")
+                continue
+            elif cache_entry["status"] == "BAD":
+                log(f"Retrying {filename} - previous attempt failed")
+            elif cache_entry["status"] == "THROTTLED":
+                log(f"Retrying {filename} - SteamGridDB was rate limiting on the previous attempt")
+            else:
+                log(f"Unknown status for {filename} in cache, reprocessing")
+
+        yield {"index": summary.place(filename), "iso_file": library_file.path, "filename": filename,
+               "fingerprint": fingerprint, "root_path": root_path, "api_key": api_key, "status": None}
+
+
+def process_jobs(jobs, stages, cache, stop_event=None, log=print):
+    """Run jobs through the pipeline, recording each finished game in the cache.
+
+    Cache updates happen on the calling thread as each game finishes. Jobs a
+    stopped scan never got to aren't recorded or returned.
+    """
+    finished_jobs = []
+    for job in run_pipeline(jobs, stages, stop_event=stop_event, log=log):
+        if job["status"] == "STOPPED":
+            continue
+        cache.record(job["fingerprint"], job["filename"], cache_entry_for_job(job))
+        finished_jobs.append(job)
+    cache.commit()
+    return finished_jobs
@@ -0,0 +1,193 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from .tracing import count, span
+
+CACHE_FILE = "cache.db"
+LEGACY_CACHE_FILE = "cache.json"
+CACHE_VERSION = 3
+
+# Bytes hashed from each end of an image. The head covers the ISO9660
+# volume descriptors (volume name, creation date), which tell discs apart.
+FINGERPRINT_BYTES = 64 * 1024
+
+# Pending writes are committed once either limit is reached
+COMMIT_EVERY = 50
+COMMIT_INTERVAL = 2.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS scanned_files (
+    fingerprint TEXT PRIMARY KEY,
+    filename TEXT,
+    status TEXT,
+    entry TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS aliases (
+    filename TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    size INTEGER,
+    mtime INTEGER
+);
+CREATE TABLE IF NOT EXISTS legacy_files (filename TEXT PRIMARY KEY, entry TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS excluded_files (filename TEXT PRIMARY KEY);
+"""
+
+
+def file_fingerprint(path, size=None):
+    """Cheap content fingerprint: file size plus a hash of its first and last blocks."""
+    if size is None:
+        size = os.path.getsize(path)
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        digest.update(f.read(FINGERPRINT_BYTES))
+        if size > 2 * FINGERPRINT_BYTES:
+            f.seek(size - FINGERPRINT_BYTES)
+            digest.update(f.read(FINGERPRINT_BYTES))
+    return f"{size:x}-{digest.hexdigest()[:24]}"
+
+
+class ScanCache:
+    """Scan results keyed by content fingerprint, stored in SQLite (WAL).
+
+    `scanned_files` maps fingerprint -> result entry, and `aliases` maps each
+    filename seen to its fingerprint plus the size/mtime it had, so an
+    unchanged file is recognised from its stat alone and a renamed or moved
+    file is recognised by re-hashing a few blocks instead of re-scanning.
+
+    Writes are batched and committed every COMMIT_EVERY changes or
+    COMMIT_INTERVAL seconds, and always on commit()/close(); a crash loses
+    at most the last uncommitted batch, never the whole cache.
+
+    Safe to share between threads: the pipeline's feed thread looks files
+    up while the main thread records finished games.
+    """
+
+    def __init__(self, path=CACHE_FILE, legacy_path=LEGACY_CACHE_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.RLock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.pending = 0
+        self.last_commit = time.monotonic()
+        if self._meta("version") is None:
+            self._migrate_json(legacy_path)
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(CACHE_VERSION),))
+            self.conn.commit()
+
+    @classmethod
+    def load(cls, path=CACHE_FILE):
+        return cls(path, os.path.join(os.path.dirname(path), LEGACY_CACHE_FILE))
+
+    def _meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _migrate_json(self, legacy_path):
+        """One-time import of the old cache.json (filename- or fingerprint-keyed)."""
+        if not legacy_path or not os.path.exists(legacy_path):
+            return
+        try:
+            with open(legacy_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return
+        if data.get("version") == 2:
+            for fingerprint, entry in data.get("scanned_files", {}).items():
+                self._put_entry(fingerprint, entry)
+            for filename, alias in data.get("aliases", {}).items():
+                self.conn.execute("INSERT OR REPLACE INTO aliases VALUES (?, ?, ?, ?)",
+                                  (filename, alias["fingerprint"], alias.get("size"), alias.get("mtime")))
+            legacy = data.get("legacy_files", {})
+        else:
+            legacy = data.get("scanned_files", {})
+        for filename, entry in legacy.items():
+            self.conn.execute("INSERT OR REPLACE INTO legacy_files VALUES (?, ?)", (filename, json.dumps(entry)))
+        for filename in data.get("excluded_files", []):
+            self.conn.execute("INSERT OR IGNORE INTO excluded_files VALUES (?)", (filename,))
+        self.conn.commit()
+        os.replace(legacy_path, legacy_path + ".migrated")
+
+    def _put_entry(self, fingerprint, entry):
+        self.conn.execute("INSERT OR REPLACE INTO scanned_files VALUES (?, ?, ?, ?)",
+                          (fingerprint, entry.get("filename"), entry.get("status"), json.dumps(entry, ensure_ascii=False)))
+
+    def _changed(self):
+        self.pending += 1
+        if self.pending >= COMMIT_EVERY or time.monotonic() - self.last_commit >= COMMIT_INTERVAL:
+            self.commit()
+
+    def commit(self):
+        with self.lock:
+            self.conn.commit()
+            self.pending = 0
+            self.last_commit = time.monotonic()
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.commit()
+                self.conn.close()
+                self.conn = None
+
+    def fingerprint(self, path, stat=None, filename=None):
+        """Fingerprint for a file, reusing the alias entry when size and mtime are unchanged.
+
+        Pass the stat result from a directory scan to avoid another stat()
+        call, and `filename` to key the alias by something other than the
+        file's base name (e.g. its path inside the library).
+        """
+        stat = stat or os.stat(path)
+        filename = filename or os.path.basename(path)
+        with self.lock:
+            row = self.conn.execute("SELECT fingerprint, size, mtime FROM aliases WHERE filename = ?", (filename,)).fetchone()
+        if row and row[1] == stat.st_size and row[2] == stat.st_mtime_ns:
+            return row[0]
+        # Hashed outside the lock so recording finished games isn't held up by disk reads
+        with span("fingerprint"):
+            fingerprint = file_fingerprint(path, stat.st_size)
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO aliases VALUES (?, ?, ?, ?)",
+                              (filename, fingerprint, stat.st_size, stat.st_mtime_ns))
+            self._changed()
+        return fingerprint
+
+    def get(self, fingerprint):
+        with self.lock:
+            row = self.conn.execute("SELECT entry FROM scanned_files WHERE fingerprint = ?", (fingerprint,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def lookup(self, path, stat=None, filename=None):
+        """Return (fingerprint, entry) for a file; entry is None if it was never scanned."""
+        fingerprint = self.fingerprint(path, stat, filename)
+        entry = self.get(fingerprint)
+        if entry is None:
+            filename = filename or os.path.basename(path)
+            with self.lock:
+                row = self.conn.execute("SELECT entry FROM legacy_files WHERE filename = ?", (filename,)).fetchone()
+                if row is not None:
+                    entry = dict(json.loads(row[0]), filename=filename)
+                    self.conn.execute("DELETE FROM legacy_files WHERE filename = ?", (filename,))
+                    self._put_entry(fingerprint, entry)
+                    self._changed()
+        count("scan_cache_hits" if entry is not None else "scan_cache_misses")
+        return fingerprint, entry
+
+    def record(self, fingerprint, filename, entry):
+        with self.lock:
+            self._put_entry(fingerprint, dict(entry, filename=filename))
+            self._changed()
+
+    def is_excluded(self, filename):
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM excluded_files WHERE filename = ?", (filename,)).fetchone() is not None
+
+    def exclude(self, filename):
+        with self.lock:
+            self.conn.execute("INSERT OR IGNORE INTO excluded_files VALUES (?)", (filename,))
+            self._changed()
@@ -0,0 +1,203 @@
+import time
+import sqlite3
+import threading
+from urllib.parse import quote
+from . import http_client
+from .fuzzy import normalize_title
+from .tracing import count, span
+
+SGDB_API_URL = "https://www.steamgriddb.com/api/v2"
+SGDB_CACHE_FILE = "sgdb_cache.db"
+
+# Client-side limit shared by every worker, well under what the API tolerates
+SGDB_RATE = 2.0
+SGDB_BURST = 4
+
+# 429 handling: retries per request, and the longest Retry-After honoured in-run
+MAX_THROTTLE_RETRIES = 3
+MAX_RETRY_AFTER = 60.0
+
+# How long answers are reused. Misses expire sooner so newly added art is picked up.
+HIT_TTL_HOURS = 7 * 24
+MISS_TTL_HOURS = 24
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS searches (
+    name_key TEXT PRIMARY KEY,
+    game_id INTEGER,
+    fetched REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS assets (
+    game_id INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    url TEXT,
+    fetched REAL NOT NULL,
+    PRIMARY KEY (game_id, category)
+);
+"""
+
+_limiter = http_client.TokenBucket(SGDB_RATE, SGDB_BURST)
+
+
+def configure_rate_limit(rate=SGDB_RATE, burst=SGDB_BURST):
+    """Replace the shared limiter, e.g. for a local stand-in API in benchmarks."""
+    global _limiter
+    _limiter = http_client.TokenBucket(rate, burst)
+
+
+class SgdbThrottled(Exception):
+    """SteamGridDB kept answering 429; the game should be retried later, not marked as having no art.
+
+    `urls` holds whatever categories were fetched before the limit hit.
+    """
+
+    def __init__(self, message, urls=None):
+        super().__init__(message)
+        self.urls = urls or {}
+
+
+class SgdbCache:
+    """Persistent SteamGridDB answers: search results by normalized title
+    and the first asset URL per (game id, category). A None value records
+    a miss. Only real answers are stored, never failed requests."""
+
+    def __init__(self, path=SGDB_CACHE_FILE, hit_ttl_hours=HIT_TTL_HOURS, miss_ttl_hours=MISS_TTL_HOURS):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.hit_ttl = hit_ttl_hours * 3600
+        self.miss_ttl = miss_ttl_hours * 3600
+        self.lock = threading.Lock()
+
+    def _fresh(self, value, fetched):
+        return time.time() - fetched < (self.hit_ttl if value is not None else self.miss_ttl)
+
+    def _get(self, sql, params):
+        with self.lock:
+            row = self.conn.execute(sql, params).fetchone()
+        if row is None or not self._fresh(row[0], row[1]):
+            count("sgdb_cache_misses")
+            return False, None
+        count("sgdb_cache_hits")
+        return True, row[0]
+
+    def _put(self, sql, params):
+        with self.lock:
+            self.conn.execute(sql, params + (time.time(),))
+            self.conn.commit()
+
+    def get_search(self, name_key):
+        """Return (found, game_id); found is False when nothing fresh is cached."""
+        return self._get("SELECT game_id, fetched FROM searches WHERE name_key = ?", (name_key,))
+
+    def put_search(self, name_key, game_id):
+        self._put("INSERT OR REPLACE INTO searches VALUES (?, ?, ?)", (name_key, game_id))
+
+    def get_asset(self, game_id, category):
+        return self._get("SELECT url, fetched FROM assets WHERE game_id = ? AND category = ?", (game_id, category))
+
+    def put_asset(self, game_id, category, url):
+        self._put("INSERT OR REPLACE INTO assets VALUES (?, ?, ?, ?)", (game_id, category, url))
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+
+class SgdbClient:
+    """SteamGridDB lookups through the shared session and the persistent cache.
+
+    A game is searched once; its id is then reused for every asset
+    category that is still missing. Requests from all workers share one
+    token bucket, and a 429 pauses that bucket for Retry-After seconds.
+    """
+
+    def __init__(self, api_key, cache=None, log=print):
+        self.headers = {"Authorization": f"Bearer {api_key}"}
+        self.cache = cache
+        self.log = log
+
+    def _get_json(self, path, what):
+        """GET an API path through the shared rate limiter. Returns the JSON
+        body, None on an error, and raises SgdbThrottled when a 429 persists."""
+        for attempt in range(MAX_THROTTLE_RETRIES + 1):
+            _limiter.acquire()
+            try:
+                with span("sgdb_api"):
+                    r = http_client.get(f"{SGDB_API_URL}/{path}", headers=self.headers)
+            except Exception as e:
+                self.log(f"[ERROR] SteamGridDB {what} failed: {e}")
+                return None
+            if r.status_code != 429:
+                break
+            count("sgdb_throttled")
+            wait = http_client.parse_retry_after(r.headers.get("Retry-After"))
+            if wait is None:
+                wait = 2.0 ** attempt
+            if attempt == MAX_THROTTLE_RETRIES or wait > MAX_RETRY_AFTER:
+                _limiter.pause(min(wait, MAX_RETRY_AFTER))
+                raise SgdbThrottled(f"SteamGridDB {what} rate limited")
+            self.log(f"[WARN] SteamGridDB rate limit hit, waiting {wait:.1f}s before retrying {what}")
+            _limiter.pause(wait)
+        if r.status_code != 200:
+            self.log(f"[ERROR] SteamGridDB {what} failed (status {r.status_code})")
+            return None
+        return r.json()
+
+    def search(self, game_name):
+        """SteamGridDB game id for a title, or None."""
+        name_key = normalize_title(game_name)
+        if self.cache is not None:
+            found, game_id = self.cache.get_search(name_key)
+            if found:
+                return game_id
+
+        data = self._get_json(f"search/autocomplete/{quote(game_name, safe='')}", f"search for {game_name}")
+        if data is None:
+            return None
+        results = data.get("data")
+        game_id = results[0]["id"] if results else None
+        if game_id is None:
+            self.log(f"[WARN] No SteamGridDB results found for {game_name}")
+        if self.cache is not None:
+            self.cache.put_search(name_key, game_id)
+        return game_id
+
+    def asset(self, game_id, category, game_name):
+        """URL of the first `category` image ("logos", "heroes", ...) for a game id, or None."""
+        if self.cache is not None:
+            found, url = self.cache.get_asset(game_id, category)
+            if found:
+                return url
+
+        data = self._get_json(f"{category}/game/{game_id}", f"{category} request for {game_name}")
+        if data is None:
+            return None
+        images = data.get("data")
+        url = images[0]["url"] if images else None
+        if url is None:
+            self.log(f"[WARN] No {category} images found for {game_name}")
+        if self.cache is not None:
+            self.cache.put_asset(game_id, category, url)
+        return url
+
+    def fetch(self, game_name, categories):
+        """Return {category: url} for the requested categories (missing ones are absent).
+
+        Raises SgdbThrottled if the API is still rate limiting after retries.
+        """
+        game_id = self.search(game_name)
+        if game_id is None:
+            return {}
+        urls = {}
+        for category in categories:
+            try:
+                url = self.asset(game_id, category, game_name)
+            except SgdbThrottled as e:
+                raise SgdbThrottled(str(e), urls) from None
+            if url:
+                self.log(f"Fetched {category} for {game_name} from SteamGridDB: {url}")
+                urls[category] = url
+        return urls
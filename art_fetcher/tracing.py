@@ -0,0 +1,170 @@
+import io
+import json
+import time
+import functools
+import threading
+from contextlib import contextmanager
+
+REPORT_FILE = "scan_report.json"
+PROFILE_FILE = "profile.pstats"
+PROFILE_REPORT_FILE = "profile.txt"
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Tracer:
+    """Collects span durations per stage and named counters from any thread.
+
+    Spans cost two perf_counter() calls and a list append, cheap enough to
+    leave on for every scan.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.samples = {}
+            self.counters = {}
+            self.started = time.perf_counter()
+
+    def add(self, name, elapsed):
+        with self.lock:
+            self.samples.setdefault(name, []).append(elapsed)
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def traced(self, name):
+        """Decorator form of span()."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.add(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def report(self):
+        with self.lock:
+            samples = {name: sorted(values) for name, values in self.samples.items()}
+            counters = dict(self.counters)
+            wall = time.perf_counter() - self.started
+        stages = {}
+        for name, ordered in samples.items():
+            stages[name] = {
+                "calls": len(ordered),
+                "total_s": round(sum(ordered), 4),
+                "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+                "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+                "max_ms": round(ordered[-1] * 1000, 3),
+            }
+        return {"wall_s": round(wall, 3), "stages": stages, "counters": counters}
+
+    def format_report(self, report=None):
+        report = report or self.report()
+        lines = [f"Scan report ({report['wall_s']:.2f}s wall time)",
+                 f"  {'stage':<24}{'calls':>7}{'total s':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}"]
+        for name, stage in sorted(report["stages"].items(), key=lambda item: -item[1]["total_s"]):
+            lines.append(f"  {name:<24}{stage['calls']:>7}{stage['total_s']:>10.3f}"
+                         f"{stage['p50_ms']:>10.2f}{stage['p95_ms']:>10.2f}{stage['max_ms']:>10.2f}")
+        for name, value in sorted(report["counters"].items()):
+            lines.append(f"  {name}: {value}")
+        return "\n".join(lines)
+
+    def write_report(self, path=REPORT_FILE):
+        report = self.report()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        return report
+
+
+# Process-wide tracer used by the scan code
+tracer = Tracer()
+span = tracer.span
+traced = tracer.traced
+count = tracer.count
+
+
+class Profiler:
+    """Optional deep profiling for --profile runs.
+
+    cProfile only sees the thread it was enabled on, so wrap() gives each
+    pipeline worker thread its own profile and the results are merged at
+    the end. tracemalloc records allocation sites and the peak. The
+    profiling modules are imported here, so importing the tracer stays cheap.
+    """
+
+    def __init__(self):
+        import cProfile
+        self.profile_class = cProfile.Profile
+        self.profiles = []
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.main = cProfile.Profile()
+
+    def start(self):
+        import tracemalloc
+        tracemalloc.start(10)
+        self.main.enable()
+
+    def _thread_profile(self):
+        profile = getattr(self.local, "profile", None)
+        if profile is None:
+            profile = self.local.profile = self.profile_class()
+            with self.lock:
+                self.profiles.append(profile)
+        return profile
+
+    def wrap(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profile = self._thread_profile()
+            profile.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.disable()
+        return wrapper
+
+    def stop(self, stats_path=PROFILE_FILE, report_path=PROFILE_REPORT_FILE, top=40):
+        """Write the merged cProfile stats and a text summary; returns the summary path."""
+        import pstats
+        import tracemalloc
+        self.main.disable()
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        stats = pstats.Stats(self.main)
+        for profile in self.profiles:
+            stats.add(profile)
+        stats.dump_stats(stats_path)
+
+        out = io.StringIO()
+        pstats.Stats(stats_path, stream=out).sort_stats("cumulative").print_stats(top)
+        out.write(f"\ntracemalloc: peak {peak / 1048576:.1f} MB, at exit {current / 1048576:.1f} MB\n")
+        out.write("Top allocation sites:\n")
+        for stat in snapshot.statistics("lineno")[:25]:
+            out.write(f"  {stat}\n")
+        with open(report_path, "w", encoding="utf-8") as f:
+            f.write(out.getvalue())
+        return report_path
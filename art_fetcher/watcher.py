@@ -0,0 +1,214 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+
+# A new or changed file is only handed out once its size and mtime have
+# stayed the same this long, so images still being copied aren't opened
+DEFAULT_SETTLE_SECONDS = 5.0
+DEFAULT_POLL_SECONDS = 2.0
+
+# inotify(7) event bits
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+_EVENT = struct.Struct("iIII")
+
+
+def stat_key(st):
+    return st.st_size, st.st_mtime_ns
+
+
+def snapshot(library):
+    """{path: (size, mtime_ns)} for every image the library scan finds."""
+    return {str(item.path): stat_key(item.stat) for item in library.scan()}
+
+
+class InotifyBackend:
+    """Directory change notifications through Linux inotify, via ctypes so no
+    extra package is needed. Every folder under the library is watched.
+    wait() returns the paths that changed, or None when the tree changed
+    shape (folders added or removed, events lost) and has to be rescanned."""
+
+    def __init__(self, directories):
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.folders = {}
+        try:
+            for directory in directories:
+                if os.path.isdir(directory):
+                    self._watch_tree(directory)
+        except OSError:
+            self.close()
+            raise
+
+    def _watch_tree(self, directory):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+        self.folders[wd] = directory
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.name.startswith(".") and entry.is_dir(follow_symlinks=False):
+                    self._watch_tree(entry.path)
+
+    def wait(self, timeout):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        paths, rescan = set(), False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return None if rescan else paths
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if mask & IN_IGNORED:
+                    self.folders.pop(wd, None)
+                if mask & (IN_Q_OVERFLOW | IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                    rescan = True
+                elif wd in self.folders and name:
+                    path = os.path.join(self.folders[wd], os.fsdecode(name))
+                    if mask & IN_ISDIR:
+                        # A folder appeared (watch it and everything in it) or went away
+                        if mask & (IN_CREATE | IN_MOVED_TO) and os.path.isdir(path):
+                            try:
+                                self._watch_tree(path)
+                            except OSError:
+                                pass
+                        rescan = True
+                    else:
+                        paths.add(path)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class PollingBackend:
+    """Fallback for other platforms and network shares (SMB/NFS mounts don't
+    report changes made by other machines through inotify): rescans the
+    library every `interval` seconds and reports what differs."""
+
+    def __init__(self, library, interval=DEFAULT_POLL_SECONDS):
+        self.library = library
+        self.interval = interval
+        self.files = snapshot(library)
+
+    def wait(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        files = snapshot(self.library)
+        changed = {name for name in files.keys() | self.files.keys() if files.get(name) != self.files.get(name)}
+        self.files = files
+        return changed
+
+    def close(self):
+        pass
+
+
+class LibraryWatcher:
+    """Watches a Library (the DVD and CD folders and their subfolders) and
+    reports images that were added or removed.
+
+    Changes are debounced: a file is only reported as added once its size
+    and mtime have been stable for `settle` seconds. A rename shows up as
+    the old name removed and the new one added; the scan cache recognises
+    the content, so the game isn't processed again.
+    """
+
+    def __init__(self, library, settle=DEFAULT_SETTLE_SECONDS,
+                 poll_interval=DEFAULT_POLL_SECONDS, use_inotify=True, log=print):
+        self.library = library
+        self.settle = settle
+        self.log = log
+        self.known = snapshot(library)
+        self.pending = {}  # path -> (stat key, monotonic time it was last seen changing)
+        self.backend = None
+        if use_inotify and sys.platform.startswith("linux"):
+            try:
+                self.backend = InotifyBackend(library.directories)
+                self.method = "inotify"
+            except (OSError, AttributeError) as e:
+                log(f"[WARN] inotify unavailable ({e}), polling the library instead")
+        if self.backend is None:
+            self.backend = PollingBackend(library, poll_interval)
+            self.method = f"polling every {poll_interval:g}s"
+
+    def poll(self, timeout=1.0):
+        """Wait up to `timeout` seconds for changes; returns (added, removed):
+        LibraryFile entries for new images and the names of removed ones."""
+        if self.pending:
+            # Wake up in time to hand out files whose settle time has passed
+            timeout = min(timeout, self.settle / 2)
+        try:
+            paths = self.backend.wait(timeout)
+        except OSError as e:
+            # e.g. a network share that went away; rescan once it answers again
+            self.log(f"[WARN] Watching the library failed: {e}")
+            time.sleep(timeout)
+            paths = None
+        if paths is None:
+            self.log("[INFO] Library folders changed, rescanning them")
+            paths = set(snapshot(self.library)) | set(self.known) | set(self.pending)
+
+        now = time.monotonic()
+        removed = []
+        for path in sorted(paths | set(self.pending)):
+            name = self.library.name_for(path)
+            if name is None:
+                continue
+            try:
+                key = stat_key(os.stat(path))
+            except OSError as e:
+                if e.errno not in (errno.ENOENT, errno.ENOTDIR):
+                    # Unreadable file or a share that dropped out: keep watching, try again on the next change
+                    self.log(f"[WARN] Could not check {path}: {e}")
+                    self.pending.pop(path, None)
+                    continue
+                self.pending.pop(path, None)
+                if self.known.pop(path, None) is not None:
+                    removed.append(name)
+                continue
+            if key == self.known.get(path):
+                self.pending.pop(path, None)
+            elif path not in self.pending or self.pending[path][0] != key:
+                self.pending[path] = (key, now)
+
+        added = []
+        for path, (key, since) in sorted(self.pending.items()):
+            if now - since >= self.settle:
+                del self.pending[path]
+                try:
+                    item = self.library.entry(path)
+                except OSError as e:
+                    self.log(f"[WARN] Could not read {path}: {e}")
+                    continue
+                self.known[path] = stat_key(item.stat)
+                added.append(item)
+        return added, removed
+
+    def close(self):
+        self.backend.close()
@@ -0,0 +1,394 @@
+"""Offline scan benchmark.
+
+Generates a synthetic library (minimal PS2 ISOs with SYSTEM.CNF, a
+GameIndex.yaml and a LaunchBox Metadata.zip), serves LaunchBox images,
+GameIndex and SteamGridDB from a local stand-in with configurable latency,
+and runs the CLI's own plan_jobs/process_jobs against it. Reports the
+scan's tracer report (per-stage timings and counters), throughput and peak
+memory for each library size.
+
+    python benchmarks/benchmark.py --sizes 10,100,1000 --latency-ms 20
+
+Each size runs in a fresh subprocess and work directory, so memory figures
+and caches don't leak between runs. Nothing touches the network.
+"""
+import os
+import io
+import sys
+import json
+import time
+import random
+import struct
+import shutil
+import zlib
+import zipfile
+import argparse
+import tempfile
+import importlib.util
+import subprocess
+import threading
+import tracemalloc
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from art_fetcher import http_client, sgdb  # noqa: E402
+from art_fetcher.fuzzy import normalize_title  # noqa: E402
+from art_fetcher.gameindex import GAMEINDEX_URL  # noqa: E402
+from art_fetcher.tracing import tracer  # noqa: E402
+
+DEFAULT_SIZES = "10,100,1000"
+SERIAL_PREFIXES = ("SLUS", "SLES", "SLPS", "SCUS", "SCES")
+WORDS = ("Shadow", "Dragon", "Racing", "Legend", "Street", "Final", "Battle", "Knight", "Star", "Ocean",
+         "Metal", "Storm", "Crystal", "Hunter", "Kingdom", "Soul", "Tekken", "Rally", "Strike", "Quest")
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# --- Synthetic data ---
+
+def _dir_record(name, lba, size, flags):
+    encoded = name.encode("ascii")
+    length = 33 + len(encoded)
+    length += length % 2
+    record = bytearray(length)
+    record[0] = length
+    struct.pack_into("<I", record, 2, lba)
+    struct.pack_into(">I", record, 6, lba)
+    struct.pack_into("<I", record, 10, size)
+    struct.pack_into(">I", record, 14, size)
+    record[25] = flags
+    record[32] = len(encoded)
+    record[33:33 + len(encoded)] = encoded
+    return bytes(record)
+
+
+def write_iso(path, gameid):
+    """Smallest ISO9660 image the GameID reader accepts: PVD, terminator,
+    root directory and SYSTEM.CNF. Sectors 0-15 are left as a sparse hole."""
+    cnf = f"BOOT2 = cdrom0:\\{gameid};1\r\nVER = 1.00\r\nVMODE = NTSC\r\n".encode("ascii")
+    root = (_dir_record("\x00", 18, 2048, 2) + _dir_record("\x01", 18, 2048, 2) +
+            _dir_record("SYSTEM.CNF;1", 19, len(cnf), 0))
+    pvd = bytearray(2048)
+    pvd[0], pvd[1:6], pvd[6] = 1, b"CD001", 1
+    pvd[156:190] = _dir_record("\x00", 18, 2048, 2)
+    terminator = bytearray(2048)
+    terminator[0], terminator[1:6] = 255, b"CD001"
+    with open(path, "wb") as f:
+        f.seek(16 * 2048)
+        for sector in (pvd, terminator, root, cnf):
+            f.write(bytes(sector).ljust(2048, b"\0"))
+
+
+def make_titles(count, rng):
+    """Unique titles; roughly one in three has regional variants and one in ten is a two-disc set."""
+    titles, used = [], set()
+    while len(titles) < count:
+        title = " ".join(rng.sample(WORDS, 3)) + f" {rng.randint(1, 99)}"
+        if normalize_title(title) not in used:
+            used.add(normalize_title(title))
+            titles.append(title)
+    return titles
+
+
+def make_library(size, rng):
+    """Return [(gameid, gameindex_name, title)] for `size` ISOs."""
+    entries, serial = [], 10000
+    titles = make_titles(size, rng)
+    for title in titles:
+        discs = 2 if rng.random() < 0.1 else 1
+        regions = rng.randint(2, 3) if rng.random() < 0.33 else 1
+        for region in range(regions):
+            for disc in range(1, discs + 1):
+                serial += 1
+                prefix = SERIAL_PREFIXES[(region + serial) % len(SERIAL_PREFIXES)]
+                gameid = f"{prefix}_{str(serial)[:3]}.{str(serial)[3:]}"
+                name = f"{title} (Disc {disc})" if discs > 1 else title
+                entries.append((gameid, name, title))
+                if len(entries) == size:
+                    return entries
+    return entries
+
+
+def write_gameindex(entries):
+    lines = []
+    for gameid, name, _ in entries:
+        serial = gameid.replace(".", "").replace("_", "-")
+        lines.append(f'{serial}:\n  name: "{name}"\n  region: "NTSC-U"\n  compat: 5')
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def write_metadata_zip(path, titles, filler_games, sgdb_fraction, rng):
+    """Metadata.zip with every PS2 title except a `sgdb_fraction` share (those fall back to
+    SteamGridDB), plus `filler_games` games for other platforms to give the XML realistic bulk."""
+    missing = set(rng.sample(titles, int(len(titles) * sgdb_fraction)))
+    out = io.StringIO()
+    out.write('<?xml version="1.0" encoding="utf-8"?>\n<LaunchBox>\n')
+    for number, title in enumerate(titles, 1):
+        if title in missing:
+            continue
+        out.write(f"<Game><Name>{title}</Name><DatabaseID>{number}</DatabaseID>"
+                  f"<Platform>Sony Playstation 2</Platform><Overview>{'Lorem ipsum ' * 20}</Overview></Game>\n")
+        out.write(f"<GameImage><DatabaseID>{number}</DatabaseID><FileName>{number}-logo.png</FileName>"
+                  f"<Type>Clear Logo</Type></GameImage>\n")
+        if rng.random() < 0.8:
+            out.write(f"<GameImage><DatabaseID>{number}</DatabaseID><FileName>{number}-hero.png</FileName>"
+                      f"<Type>Fanart - Background</Type></GameImage>\n")
+    for number in range(len(titles) + 1, len(titles) + filler_games + 1):
+        out.write(f"<Game><Name>Filler {number}</Name><DatabaseID>{number}</DatabaseID>"
+                  f"<Platform>Nintendo 64</Platform><Overview>{'Lorem ipsum ' * 20}</Overview></Game>\n")
+        out.write(f"<GameImage><DatabaseID>{number}</DatabaseID><FileName>{number}.png</FileName>"
+                  f"<Type>Clear Logo</Type></GameImage>\n")
+    out.write("</LaunchBox>\n")
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        zip_file.writestr("Metadata.xml", out.getvalue())
+    return len(out.getvalue())
+
+
+def make_png(width=400, height=225):
+    """Solid-colour RGB PNG, written by hand so generation doesn't need Pillow."""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    rows = b"".join(b"\0" + bytes((40, 90, 160)) * width for _ in range(height))
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)) +
+            chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b""))
+
+
+# --- Stand-in HTTP backend ---
+
+class FakeBackend:
+    """Answers LaunchBox image, GameIndex and SteamGridDB URLs.
+
+    It speaks the LAN art cache protocol (GET /fetch?url=...), so pointing
+    http_client.set_cache_server() at it routes every request of the scan
+    here without changing any upstream URL in the code under test.
+    """
+
+    def __init__(self, gameindex, png, latency):
+        self.gameindex = gameindex
+        self.png = png
+        self.latency = latency
+        self.requests = 0
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+        backend = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                url = parse_qs(urlsplit(self.path).query).get("url", [""])[0]
+                status, content_type, body = backend.respond(url)
+                if backend.latency:
+                    time.sleep(backend.latency)
+                with backend.lock:
+                    backend.requests += 1
+                    backend.bytes_sent += len(body)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def respond(self, url):
+        parts = urlsplit(url)
+        if url == GAMEINDEX_URL:
+            return 200, "text/plain", self.gameindex
+        if parts.netloc in ("images.launchbox-app.com", "cdn2.steamgriddb.com"):
+            return 200, "image/png", self.png
+        if parts.netloc == "www.steamgriddb.com":
+            path = parts.path.split("/api/v2/", 1)[-1]
+            if path.startswith("search/autocomplete/"):
+                game_id = zlib.crc32(normalize_title(unquote(path.rsplit("/", 1)[-1])).encode("utf-8"))
+                data = [{"id": game_id, "name": unquote(path.rsplit("/", 1)[-1])}]
+            else:
+                category, _, game_id = path.split("/")
+                data = [{"url": f"https://cdn2.steamgriddb.com/{category}/{game_id}.png"}]
+            return 200, "application/json", json.dumps({"success": True, "data": data}).encode("utf-8")
+        return 404, "text/plain", b"not found"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# --- Measurement ---
+
+def load_cli():
+    spec = importlib.util.spec_from_file_location("art_fetcher_cli", REPO_ROOT / "PS2_OSD-XMB_Art_Fetcher.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_single(args):
+    """Generate a library of args.single ISOs, scan it and return the measurements."""
+    rng = random.Random(args.seed)
+    work = Path(tempfile.mkdtemp(prefix="artbench-"))
+    os.chdir(work)
+    try:
+        start = time.perf_counter()
+        entries = make_library(args.single, rng)
+        titles = sorted({title for _, _, title in entries})
+        dvd = work / "DVD"
+        dvd.mkdir()
+        (work / "OSDXMB").mkdir()
+        for number, (gameid, _, _) in enumerate(entries):
+            write_iso(dvd / f"Game {number:05d}.iso", gameid)
+        xml_bytes = write_metadata_zip(work / "Metadata.zip", titles, args.metadata_filler, args.sgdb_fraction, rng)
+        generate_s = time.perf_counter() - start
+
+        backend = FakeBackend(write_gameindex(entries), make_png(), args.latency_ms / 1000).start()
+        http_client.set_cache_server(backend.url)
+        http_client.configure(pool_size=args.jobs * 2)
+        sgdb.configure_rate_limit(args.sgdb_rate or 1e9, max(1, args.jobs))
+
+        cli = load_cli()
+        from art_fetcher.logger import setup_logging, write_log
+        setup_logging(str(work / "log.txt"))
+        cli.log = write_log  # log file only, no console output
+
+        if args.tracemalloc:
+            tracemalloc.start()
+        tracer.reset()
+        scan_start = time.perf_counter()
+
+        # The CLI's own planning and pipeline; GameIndex and Metadata.zip load on first use as in a real scan
+        cache = cli.ScanCache.load(cli.CACHE_FILE)
+        cli.image_processor = cli.ImageProcessor(enabled=not args.raw_images, log=write_log)
+        cli.blob_store = cli.BlobStore()
+        stages = cli.scan_stages(args.jobs)
+        library = cli.Library(work, log=write_log)
+        jobs = cli.plan_jobs(cache, library.scan(), work, "benchmark", cli.ScanSummary(), log=write_log,
+                             library=library)
+        finished_jobs = cli.process_jobs(jobs, stages, cache, log=write_log)
+        cache.close()
+        cli.image_processor.shutdown()
+        statuses = {}
+        for job in finished_jobs:
+            statuses[job["status"]] = statuses.get(job["status"], 0) + 1
+        scan_s = time.perf_counter() - scan_start
+
+        traced_peak = None
+        if args.tracemalloc:
+            traced_peak = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+            tracemalloc.stop()
+        result = {
+            "isos": len(entries),
+            "titles": len(titles),
+            "metadata_xml_mb": round(xml_bytes / (1024 * 1024), 1),
+            "generate_s": round(generate_s, 3),
+            "scan_s": round(scan_s, 3),
+            "isos_per_s": round(len(entries) / scan_s, 1) if scan_s else None,
+            "statuses": statuses,
+            "http_requests": backend.requests,
+            "http_mb": round(backend.bytes_sent / (1024 * 1024), 2),
+            "art_store": dict(cli.blob_store.stats),
+            "peak_rss_mb": peak_rss_mb(),
+            "peak_traced_mb": traced_peak,
+            "trace": tracer.report(),
+        }
+        cli.blob_store.close()
+        backend.stop()
+        return result
+    finally:
+        os.chdir(REPO_ROOT)
+        if not args.keep:
+            shutil.rmtree(work, ignore_errors=True)
+
+
+def format_result(size, result):
+    lines = [f"== {result['isos']} ISOs ({result['titles']} titles, Metadata.xml {result['metadata_xml_mb']} MB) ==",
+             f"  scan {result['scan_s']:.2f}s  ({result['isos_per_s']} ISOs/s), "
+             f"generation {result['generate_s']:.2f}s, peak RSS {result['peak_rss_mb']} MB"
+             + (f", peak traced {result['peak_traced_mb']} MB" if result["peak_traced_mb"] is not None else ""),
+             f"  statuses {result['statuses']}, {result['http_requests']} HTTP requests ({result['http_mb']} MB)"]
+    lines.append("  " + tracer.format_report(result["trace"]).replace("\n", "\n  "))
+    return "\n".join(lines)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the art fetcher scan.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help="comma-separated library sizes to run, 10 to 10000 (default: %(default)s)")
+    parser.add_argument("--jobs", type=int, default=4, help="workers per scan stage (default: %(default)s)")
+    parser.add_argument("--latency-ms", type=float, default=20.0,
+                        help="delay added to every stand-in HTTP response (default: %(default)s)")
+    parser.add_argument("--metadata-filler", type=int, default=5000,
+                        help="extra non-PS2 games in Metadata.xml (default: %(default)s)")
+    parser.add_argument("--sgdb-fraction", type=float, default=0.2,
+                        help="share of titles missing from Metadata.xml, served by SteamGridDB (default: %(default)s)")
+    parser.add_argument("--sgdb-rate", type=float, default=0,
+                        help="SteamGridDB requests per second, 0 for no limit (default: %(default)s)")
+    parser.add_argument("--raw-images", action="store_true", help="skip PNG conversion")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="also report peak Python allocations (slows the run down)")
+    parser.add_argument("--seed", type=int, default=1234, help="random seed for the synthetic data")
+    parser.add_argument("--json", metavar="FILE", help="also write all results to FILE as JSON")
+    parser.add_argument("--keep", action="store_true", help="keep the generated work directories")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def single_run_args(args, size):
+    argv = ["--single", str(size), "--jobs", str(args.jobs), "--latency-ms", str(args.latency_ms),
+            "--metadata-filler", str(args.metadata_filler), "--sgdb-fraction", str(args.sgdb_fraction),
+            "--sgdb-rate", str(args.sgdb_rate), "--seed", str(args.seed)]
+    for flag in ("raw_images", "tracemalloc", "keep"):
+        if getattr(args, flag):
+            argv.append("--" + flag.replace("_", "-"))
+    return argv
+
+
+def main():
+    args = parse_args()
+    if args.single:
+        print(json.dumps(run_single(args)))
+        return
+
+    results = {}
+    for size in (int(value) for value in args.sizes.split(",") if value.strip()):
+        proc = subprocess.run([sys.executable, __file__] + single_run_args(args, size), capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"== {size} ISOs failed ==\n{proc.stderr}", file=sys.stderr)
+            continue
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        results[size] = result
+        print(format_result(size, result), flush=True)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
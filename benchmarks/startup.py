@@ -0,0 +1,92 @@
+"""GUI startup-time check.
+
+Launches the GUI (or a PyInstaller build of it) several times with
+ART_FETCHER_STARTUP_CHECK set, so it closes itself as soon as the main
+window is visible, and compares the median time against a budget:
+
+    python benchmarks/startup.py --runs 5 --budget-ms 500
+    python benchmarks/startup.py --exe dist/PS2_OSD-XMB_Art_Fetcher.exe
+
+Two figures are reported per run: the launch-to-window wall time seen from
+here (includes interpreter start and one-file unpacking), and the time the
+app measured itself from its first import. The check also fails if any
+module that should only load once a scan runs (requests, yaml, pycdlib, SQLite,
+the image process pool, the art_fetcher scan modules, ...) was imported before
+the window appeared. Exits 1 when over budget.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+GUI_SCRIPT = REPO_ROOT / "PS2_OSD-XMB_Art_Fetcher_GUI.py"
+
+# Must match STARTUP_CHECK_ENV in the GUI script
+STARTUP_CHECK_ENV = "ART_FETCHER_STARTUP_CHECK"
+DEFAULT_BUDGET_MS = 500
+RUN_TIMEOUT = 60
+
+
+def launch_once(command, cwd):
+    """Run the app once; returns (wall_ms, report) where report is the app's own JSON."""
+    fd, report_path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    os.remove(report_path)
+    env = dict(os.environ, **{STARTUP_CHECK_ENV: report_path})
+    try:
+        start = time.perf_counter()
+        proc = subprocess.run(command, cwd=cwd, env=env, capture_output=True, text=True, timeout=RUN_TIMEOUT)
+        wall_ms = (time.perf_counter() - start) * 1000
+        if not os.path.exists(report_path):
+            raise RuntimeError(f"app exited with {proc.returncode} without a startup report:\n{proc.stderr}")
+        with open(report_path, "r", encoding="utf-8") as f:
+            return wall_ms, json.load(f)
+    finally:
+        if os.path.exists(report_path):
+            os.remove(report_path)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Check how quickly the GUI window appears.")
+    parser.add_argument("--runs", type=int, default=5, help="launches to take the median of (default: %(default)s)")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="maximum median launch-to-window time (default: %(default)s)")
+    parser.add_argument("--exe", metavar="PATH", help="time a built executable instead of the script")
+    parser.add_argument("--json", metavar="FILE", help="also write the results to FILE as JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    command = [args.exe] if args.exe else [sys.executable, str(GUI_SCRIPT)]
+
+    # Run from an empty directory so a saved config.json or cache can't change the result
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for run in range(args.runs):
+            wall_ms, report = launch_once(command, work_dir)
+            results.append({"wall_ms": round(wall_ms, 1), **report})
+            print(f"  run {run + 1}: {wall_ms:.0f} ms to window ({report['visible_ms']:.0f} ms in-process)")
+
+    wall_ms = statistics.median(result["wall_ms"] for result in results)
+    loaded = sorted({name for result in results for name in result["loaded_deferred_modules"]})
+    print(f"Median {wall_ms:.0f} ms, budget {args.budget_ms:.0f} ms")
+    if loaded:
+        print(f"Loaded before the window appeared: {', '.join(loaded)}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"median_ms": wall_ms, "budget_ms": args.budget_ms, "runs": results}, f, indent=2)
+
+    ok = wall_ms <= args.budget_ms and not loaded
+    print("OK" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
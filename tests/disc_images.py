@@ -0,0 +1,196 @@
+"""Builders for the small disc images the reader tests run against.
+
+Everything is generated in memory, so the tests need no binary fixtures:
+a minimal ISO9660 volume, and CSO/ZSO/CHD wrappers around its bytes.
+"""
+import lzma
+import struct
+import zlib
+
+SECTOR_SIZE = 2048
+SYSTEM_CNF_TEXT = b"BOOT2 = cdrom0:\\SLUS_203.12;1\r\nVER = 1.00\r\nVMODE = NTSC\r\n"
+
+
+def _both_endian(value, size):
+    return value.to_bytes(size, "little") + value.to_bytes(size, "big")
+
+
+def dir_record(name, lba, size, flags=0):
+    length = 33 + len(name)
+    length += length % 2
+    record = (bytes([length, 0]) + _both_endian(lba, 4) + _both_endian(size, 4) + bytes(7)
+              + bytes([flags, 0, 0]) + _both_endian(1, 2) + bytes([len(name)]) + name)
+    return record.ljust(length, b"\0")
+
+
+def make_iso(system_cnf_dir=None, sectors=24):
+    """An ISO9660 volume holding SYSTEM.CNF in the root directory, or in
+    `system_cnf_dir` when given. Layout: PVD at 16, terminator at 17, root
+    directory at 18, subdirectory at 19, SYSTEM.CNF at 20."""
+    image = bytearray(sectors * SECTOR_SIZE)
+
+    def put(lba, data):
+        image[lba * SECTOR_SIZE:lba * SECTOR_SIZE + len(data)] = data
+
+    root = dir_record(b"\0", 18, SECTOR_SIZE, 0x02)
+    put(16, b"\x01CD001\x01" + bytes(149) + root)
+    put(17, b"\xffCD001\x01")
+
+    cnf = dir_record(b"SYSTEM.CNF;1", 20, len(SYSTEM_CNF_TEXT))
+    entries = [root, dir_record(b"\1", 18, SECTOR_SIZE, 0x02)]
+    if system_cnf_dir:
+        entries.append(dir_record(system_cnf_dir.encode("ascii"), 19, SECTOR_SIZE, 0x02))
+        put(19, dir_record(b"\0", 19, SECTOR_SIZE, 0x02) + dir_record(b"\1", 18, SECTOR_SIZE, 0x02) + cnf)
+    else:
+        entries.append(cnf)
+    put(18, b"".join(entries))
+    put(20, SYSTEM_CNF_TEXT)
+    return bytes(image)
+
+
+def lz4_block(data):
+    """A raw LZ4 block: a zero-filled block as one literal plus an
+    overlapping match, anything else as literals only."""
+    def length_bytes(length):
+        out = bytearray()
+        while length >= 255:
+            out.append(255)
+            length -= 255
+        out.append(length)
+        return bytes(out)
+
+    if data and not any(data):
+        match = len(data) - 1 - 4
+        token = (1 << 4) | min(match, 15)
+        out = bytes([token]) + data[:1] + b"\x01\x00"
+        return out + (length_bytes(match - 15) if match >= 15 else b"")
+    token = min(len(data), 15) << 4
+    extra = length_bytes(len(data) - 15) if len(data) >= 15 else b""
+    return bytes([token]) + extra + data
+
+
+def _deflate(data):
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush()
+
+
+def make_cso(data, block_size=SECTOR_SIZE, align=0, magic=b"CISO"):
+    """A CSO v1 (deflate) or ZSO (LZ4) image. Blocks that don't shrink are
+    stored with the high index bit set, and every block starts on a
+    1 << align boundary."""
+    compress = lz4_block if magic == b"ZISO" else _deflate
+    blocks = [data[i:i + block_size] for i in range(0, len(data), block_size)]
+    header = struct.pack("<4sIQIBB2x", magic, 24, len(data), block_size, 1, align)
+    position = len(header) + (len(blocks) + 1) * 4
+    index, body = [], bytearray()
+
+    def pad():
+        nonlocal position
+        padding = -position % (1 << align)
+        body.extend(bytes(padding))
+        position += padding
+
+    for block in blocks:
+        pad()
+        packed = compress(block)
+        flag = 0
+        if len(packed) >= len(block):
+            packed, flag = block, 0x80000000
+        index.append(flag | (position >> align))
+        body.extend(packed)
+        position += len(packed)
+    pad()
+    index.append(position >> align)
+    return header + struct.pack(f"<{len(index)}I", *index) + bytes(body)
+
+
+class BitWriter:
+    """MSB-first bit writer, the counterpart of compressed_images.BitReader."""
+
+    def __init__(self):
+        self.bits = []
+
+    def write(self, value, count):
+        self.bits.extend((value >> shift) & 1 for shift in range(count - 1, -1, -1))
+
+    def getvalue(self):
+        padded = self.bits + [0] * (-len(self.bits) % 8)
+        return bytes(int("".join(map(str, padded[i:i + 8])), 2) for i in range(0, len(padded), 8))
+
+
+# Map symbols used by make_chd: eight 3-bit codes make a complete tree
+CHD_MAP_SYMBOLS = (0, 1, 4, 5, 7, 8, 9, 10)
+
+
+def _lzma_raw(data):
+    return lzma.compress(data, format=lzma.FORMAT_RAW, filters=[
+        {"id": lzma.FILTER_LZMA1, "dict_size": 1 << 16, "lc": 3, "lp": 0, "pb": 2}])
+
+
+def make_chd(data, hunk_types, hunk_size=2 * SECTOR_SIZE, unit_bytes=SECTOR_SIZE):
+    """A CHD v5 image with codecs zlib (type 0) and lzma (type 1).
+
+    `hunk_types` is the sequence of map symbols to write, one per hunk
+    except CHD_RLE_SMALL (7), which is followed by its repeat count and
+    covers 3 + count hunks of the previous type (one without a payload,
+    such as SELF_0). SELF (5) entries are given as (5, target hunk).
+    """
+    hunks = [data[i:i + hunk_size] for i in range(0, len(data), hunk_size)]
+    header_size = 124
+    body = bytearray()
+    entries = []  # (type, payload) in hunk order, for the offsets section
+    types = BitWriter()
+    lengths = [3 if symbol in CHD_MAP_SYMBOLS else 0 for symbol in range(16)]
+    for length in lengths:
+        types.write(length, 4)
+
+    def code(symbol):
+        types.write(CHD_MAP_SYMBOLS.index(symbol), 3)
+
+    hunk = 0
+    last = None
+    items = iter(hunk_types)
+    for item in items:
+        kind, target = item if isinstance(item, tuple) else (item, None)
+        code(kind)
+        if kind == 7:
+            count = next(items)
+            code(count)
+            entries.extend([(last, None)] * (3 + count))
+            hunk += 3 + count
+            continue
+        if kind == 0:
+            payload = _deflate(hunks[hunk])
+        elif kind == 1:
+            payload = _lzma_raw(hunks[hunk])
+        elif kind == 4:
+            payload = hunks[hunk]
+        else:
+            payload = target
+        entries.append((kind, payload))
+        last = kind
+        hunk += 1
+    assert hunk == len(hunks)
+
+    length_bits, self_bits = 16, 8
+    for kind, payload in entries:
+        if kind in (0, 1):
+            types.write(len(payload), length_bits)
+            types.write(0, 16)
+            body.extend(payload)
+        elif kind == 4:
+            types.write(0, 16)
+            body.extend(payload)
+        elif kind == 5:
+            types.write(payload, self_bits)
+
+    map_offset = header_size + len(body)
+    stream = types.getvalue()
+    map_header = (struct.pack(">I", len(stream)) + header_size.to_bytes(6, "big") + bytes(2)
+                  + bytes([length_bits, self_bits, 0, 0]))
+    header = bytearray(header_size)
+    header[0:8] = b"MComprHD"
+    struct.pack_into(">II", header, 8, header_size, 5)
+    header[16:32] = b"zlib" + b"lzma" + bytes(8)
+    struct.pack_into(">QQQII", header, 32, len(data), map_offset, 0, hunk_size, unit_bytes)
+    return bytes(header) + bytes(body) + map_header + stream
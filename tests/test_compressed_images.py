@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+from art_fetcher.compressed_images import (CHD_CODEC_0, CHD_NONE, CHD_SELF, ChdReader, CsoReader,
+                                           lz4_block_decompress, open_compressed)
+from art_fetcher.iso_reader import read_gameid
+
+from .disc_images import SECTOR_SIZE, lz4_block, make_chd, make_cso, make_iso
+
+
+def disc_data():
+    # The ISO plus one incompressible sector, so both compressed and stored blocks occur
+    return make_iso() + random.Random(0).getrandbits(SECTOR_SIZE * 8).to_bytes(SECTOR_SIZE, "little")
+
+
+def write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return path
+
+
+@pytest.mark.parametrize("align", [0, 2])
+def test_cso_v1_reads_back_the_image(tmp_path, align):
+    data = disc_data()
+    path = write(tmp_path, "game.cso", make_cso(data, align=align))
+    with open_compressed(path) as reader:
+        assert isinstance(reader, CsoReader)
+        assert (reader.version, reader.align) == (1, align)
+        assert reader.total_bytes == len(data)
+        assert reader.read(0, len(data)) == data
+        # Reads spanning a block boundary and past the end of the image
+        assert reader.read(SECTOR_SIZE * 20 - 5, 10) == data[SECTOR_SIZE * 20 - 5:SECTOR_SIZE * 20 + 5]
+        assert reader.read(len(data) - 4, 100) == data[-4:]
+    assert read_gameid(path) == "SLUS_203.12"
+
+
+def test_zso_reads_back_the_image(tmp_path):
+    data = disc_data()
+    path = write(tmp_path, "game.zso", make_cso(data, magic=b"ZISO"))
+    with open_compressed(path) as reader:
+        assert reader.magic == b"ZISO"
+        assert reader.read(0, len(data)) == data
+    assert read_gameid(path) == "SLUS_203.12"
+
+
+def test_lz4_block_overlapping_match():
+    block = b"PS2" + bytes(SECTOR_SIZE - 3)
+    assert lz4_block_decompress(b"\x4f" + b"PS2\0" + b"\x01\x00" + bytes([255] * 7) + bytes([240]), SECTOR_SIZE) == block
+    assert lz4_block_decompress(lz4_block(bytes(SECTOR_SIZE)), SECTOR_SIZE) == bytes(SECTOR_SIZE)
+
+
+# Map symbols: codec 0/1, NONE, SELF, RLE_SMALL + count, SELF_0, SELF_1
+CHD_HUNKS = [0, (5, 0), 9, 7, 0, 9, 10, 1, 4, 0, 10]
+
+
+def test_chd_map_decode(tmp_path):
+    data = make_iso()
+    path = write(tmp_path, "game.chd", make_chd(data, CHD_HUNKS))
+    with open_compressed(path) as reader:
+        assert isinstance(reader, ChdReader)
+        assert reader.hunk_count == 12
+        reader._load_map()
+        assert list(reader.map_types) == [0, 5, 9, 9, 9, 9, 9, 10, 1, 4, 0, 10]
+
+        # SELF_0 repeats the last self reference, SELF_1 advances it
+        assert reader._map_entry(1) == (CHD_SELF, 0, 0)
+        assert reader._map_entry(5) == (CHD_SELF, 0, 0)
+        assert reader._map_entry(7) == (CHD_SELF, 0, 1)
+        assert reader._map_entry(11) == (CHD_SELF, 0, 2)
+
+        # Compressed offsets are cumulative from the first one in the map header
+        first_kind, first_length, first_offset = reader._map_entry(0)
+        assert (first_kind, first_offset) == (CHD_CODEC_0, 124)
+        lzma_offset, lzma_length = reader._map_entry(8)[2], reader._map_entry(8)[1]
+        assert lzma_offset == first_offset + first_length
+        assert reader._map_entry(9) == (CHD_NONE, reader.block_size, lzma_offset + lzma_length)
+
+        assert reader.read(0, len(data)) == data
+    assert read_gameid(path) == "SLUS_203.12"
+
+
+def test_chd_map_decodes_lazily(tmp_path):
+    path = write(tmp_path, "game.chd", make_chd(make_iso(), CHD_HUNKS))
+    with ChdReader(path) as reader:
+        reader.read(2 * reader.block_size, 10)
+        assert len(reader.map) == 3
+
+
+def test_open_compressed_ignores_plain_images(tmp_path):
+    assert open_compressed(write(tmp_path, "game.iso", make_iso())) is None
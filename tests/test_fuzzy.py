@@ -0,0 +1,65 @@
+from difflib import SequenceMatcher
+
+import pytest
+
+from art_fetcher.fuzzy import TitleMatcher, strip_disc_suffix
+
+TITLES = [
+    "Tekken 4", "Tekken 5", "Tekken Tag Tournament", "Dark Tekken", "Tekken Dark",
+    "Gran Turismo 3: A-Spec", "Gran Turismo 4", "Gran Turismo Concept: 2002 Tokyo-Geneva",
+    "Ratchet & Clank", "Ratchet & Clank: Going Commando", "Ratchet & Clank: Up Your Arsenal",
+    "Ratchet: Deadlocked", "Ratchet Gladiator", "Ratchet: Gladiator",
+    "Final Fantasy X", "Final Fantasy X-2", "Final Fantasy XII", "Final Fantasy XI Online",
+    "Kingdom Hearts", "Kingdom Hearts II", "Kingdom Hearts Re:Chain of Memories",
+    "Metal Gear Solid 2: Sons of Liberty", "Metal Gear Solid 3: Snake Eater", "Metal Gear Solid 2: Substance",
+    "Grand Theft Auto III", "Grand Theft Auto: Vice City", "Grand Theft Auto: San Andreas",
+    "Shadow of the Colossus", "Ico", "Okami", "Silent Hill 2", "Silent Hill 3", "Silent Hill 4: The Room",
+    "SSX", "SSX Tricky", "SSX 3", "SSX On Tour", "Jak and Daxter: The Precursor Legacy", "Jak II", "Jak 3",
+    "Devil May Cry", "Devil May Cry 2", "Devil May Cry 3: Dante's Awakening",
+    "Burnout 3: Takedown", "Burnout Revenge", "Ace Combat 04: Shattered Skies", "Ace Combat 5: The Unsung War",
+]
+
+QUERIES = [
+    "Tekken", "Tekken 5", "TEKKEN-4", "Tekken Tag", "Gran Turismo 3 A-Spec", "Gran Turismo",
+    "Ratchet and Clank", "Ratchet & Clank - Going Commando", "Ratchet - Gladiator", "Ratchet Deadlocked",
+    "Final Fantasy X (Disc 1)", "Final Fantasy X-2 International", "Final Fantasy 12",
+    "Kingdom Hearts 2", "Kingdom Hearts - Re Chain of Memories", "Metal Gear Solid 3 - Snake Eater",
+    "Metal Gear Solid 2 - Substance", "Grand Theft Auto - Vice City", "GTA San Andreas",
+    "Shadow of Colossus", "ICO", "Okami (USA)", "Silent Hill 4 - The Room", "SSX 3", "SSX Tricky",
+    "Jak & Daxter - The Precursor Legacy", "Jak 2", "Devil May Cry 3 - Dante's Awakening (Special Edition)",
+    "Burnout 3", "Ace Combat 5", "Ace Combat - Distant Thunder", "Some Game Not In The List", "",
+]
+
+
+def linear_best_match(titles, query, threshold):
+    """The full scan TitleMatcher replaced: SequenceMatcher over every title."""
+    best_match, highest_similarity = None, 0
+    for key, title in titles:
+        similarity = SequenceMatcher(None, query.lower(), title.lower()).ratio()
+        if similarity > highest_similarity and similarity > threshold:
+            highest_similarity = similarity
+            best_match = (key, title, similarity)
+    return best_match
+
+
+@pytest.mark.parametrize("max_candidates", [1, 3, 200])
+@pytest.mark.parametrize("threshold", [0.5, 0.7])
+def test_matches_linear_scan(max_candidates, threshold):
+    titles = list(enumerate(TITLES))
+    matcher = TitleMatcher(titles, max_candidates=max_candidates)
+    for query in QUERIES:
+        for title in (query, strip_disc_suffix(query)):
+            expected = linear_best_match(titles, title, threshold)
+            if max_candidates < len(titles) and expected is not None:
+                # The candidate cut is a heuristic: only compare lookups whose
+                # best title survives it
+                if expected[0] not in matcher.candidates(title, threshold):
+                    continue
+            assert matcher.best_match(title, threshold) == expected, title
+
+
+def test_candidate_cut_keeps_ties():
+    # Both titles normalize to "ratchet gladiator", so they tie on trigram overlap
+    matcher = TitleMatcher(enumerate(["Ratchet: Gladiator", "Ratchet Gladiator"]), max_candidates=1)
+    assert matcher.best_match("Ratchet - Gladiator")[:2] == (1, "Ratchet Gladiator")
+    assert matcher.best_match("Ratchet Gladiator")[:2] == (1, "Ratchet Gladiator")
@@ -0,0 +1,27 @@
+import pytest
+
+from art_fetcher.iso_reader import IsoFormatError, read_gameid
+
+from .disc_images import make_iso
+
+
+def test_read_gameid_from_root_system_cnf(tmp_path):
+    path = tmp_path / "game.iso"
+    path.write_bytes(make_iso())
+    assert read_gameid(path) == "SLUS_203.12"
+
+
+def test_system_cnf_in_subdirectory_is_not_used(tmp_path):
+    # The PS2 only boots from the root SYSTEM.CNF; the fast path must leave
+    # other layouts to the fallback parser rather than pick up a nested one
+    path = tmp_path / "game.iso"
+    path.write_bytes(make_iso(system_cnf_dir="EXTRA"))
+    with pytest.raises(IsoFormatError, match="not found in root directory"):
+        read_gameid(path)
+
+
+def test_read_gameid_rejects_non_iso(tmp_path):
+    path = tmp_path / "game.iso"
+    path.write_bytes(bytes(40 * 2048))
+    with pytest.raises(IsoFormatError):
+        read_gameid(path)